@@ -6,10 +6,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 # from flask_bootstrap import Bootstrap5 # <-- УДАЛЯЕМ
 from flask_migrate import Migrate
-import markdown
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 
-db = SQLAlchemy()
+from app.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 migrate = Migrate()
@@ -21,22 +23,66 @@ login_manager.login_message_category = 'warning'
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if app.config['TRUSTED_PROXY_COUNT']:
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
     upload_folder = app.config['UPLOAD_FOLDER']
     if not os.path.exists(upload_folder):
         os.makedirs(upload_folder)
 
+    from app.engine import engine_options, register_pool_gauges
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config['REPLICA_DATABASE_URI']:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {},
+                                              replica=app.config['REPLICA_DATABASE_URI'])
     db.init_app(app)
+    register_pool_gauges(app, db)
+
+    from app.replicas import replica_router
+    replica_router.init_app(app, db)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+
+    from app.sqltrace import init_sqltrace
+    init_sqltrace(app)
+
+    from app.cache import init_cache
+    init_cache(app)
+
+    from app.permissions import init_permissions, can
+    init_permissions(app)
+    app.jinja_env.globals['can'] = can
+
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
+
+    from app.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+
+    from app.images import image_pipeline
+    image_pipeline.init_app(app)
     
-    def markdown_to_html(text):
-        return markdown.markdown(text)
-    app.jinja_env.filters['markdown'] = markdown_to_html
+    # Запасной рендер для строк, у которых ещё нет description_html (см. flask backfill-descriptions)
+    from app.sanitize import render_markdown
+    app.jinja_env.filters['markdown'] = render_markdown
+
+    from app.cli import (backfill_descriptions_command, rebuild_search_index_command,
+                         check_adoption_counters_command, worker_command, jobs_stats_command,
+                         seed_command)
+    app.cli.add_command(backfill_descriptions_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(check_adoption_counters_command)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(jobs_stats_command)
+    app.cli.add_command(seed_command)
 
     from app.routes import bp as routes_bp
     app.register_blueprint(routes_bp)
 
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp)
+
     return app
 
 from app import models
\ No newline at end of file
@@ -0,0 +1,158 @@
+# app/adoptions.py
+
+from collections import Counter, namedtuple
+from sqlalchemy import case, update
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Animal, Adoption, User
+from app.pagination import keyset_paginate
+
+ACTIONS = ('accept', 'reject')
+
+# accepted/rejected - id заявок, которые сменили статус; superseded - принятые в том же
+# пакете заявки на животное, которое досталось более ранней заявке (получают rejected_adopted);
+# skipped - id заявок, которые уже не ожидали решения;
+# animals - {id животного: (старый статус, новый статус)}
+ModerationResult = namedtuple('ModerationResult', 'accepted rejected superseded skipped animals')
+
+
+def lock_animals(animal_ids):
+    """
+    Блокирует строки животных до конца транзакции и возвращает {id: (статус, pending_count)}.
+    Строки берутся в порядке id, чтобы встречные пакеты не взаимоблокировались.
+    SQLite не знает FOR UPDATE, поэтому там блокировка записи берётся пустым UPDATE.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(
+            update(Animal).where(Animal.id.in_(animal_ids)).values(status=Animal.status),
+            execution_options={'synchronize_session': False}
+        )
+    rows = db.session.execute(
+        db.select(Animal.id, Animal.status, Animal.pending_count)
+        .where(Animal.id.in_(animal_ids)).order_by(Animal.id).with_for_update()
+    )
+    return {row.id: (row.status, row.pending_count) for row in rows}
+
+
+def register_application(animal_id):
+    """
+    Учитывает новую заявку на животное одним UPDATE: счётчики заявок и переход
+    available -> adoption. Возвращает False, если животное уже пристроено.
+    Транзакцию, в которой добавляется сама заявка, фиксирует вызывающий код.
+    """
+    result = db.session.execute(
+        update(Animal)
+        .where(Animal.id == animal_id, Animal.status != 'adopted')
+        .values(adoption_count=Animal.adoption_count + 1,
+                pending_count=Animal.pending_count + 1,
+                status=case((Animal.status == 'available', 'adoption'), else_=Animal.status)),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount == 1
+
+
+def moderate_adoptions(decisions):
+    """
+    Принимает и отклоняет заявки {id заявки: 'accept' | 'reject'} одной транзакцией.
+    Сначала блокируются животные, затем под блокировкой перечитываются заявки,
+    и все переходы статусов выполняются несколькими UPDATE над множествами строк;
+    статусы животных и pending_count пишутся одним пакетным UPDATE по первичному ключу.
+    Решение применяется только к заявкам в статусе pending; из нескольких принятых
+    заявок на одно животное побеждает самая ранняя, остальные получают rejected_adopted.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if not decisions:
+        return ModerationResult([], [], [], [], {})
+
+    animal_ids = db.session.scalars(
+        db.select(Adoption.animal_id).where(Adoption.id.in_(decisions)).distinct()
+    ).all()
+    locked = lock_animals(animal_ids)
+
+    rows = db.session.execute(
+        db.select(Adoption.id, Adoption.animal_id, Adoption.status)
+        .where(Adoption.id.in_(decisions))
+        .order_by(Adoption.application_date, Adoption.id)
+    ).all()
+
+    adopted, accepted, rejected, superseded, skipped = {}, [], [], [], []
+    rejected_per_animal = Counter()
+    for adoption_id, animal_id, status in rows:
+        if status != 'pending' or locked[animal_id][0] == 'adopted':
+            skipped.append(adoption_id)
+        elif decisions[adoption_id] == 'accept' and animal_id not in adopted:
+            adopted[animal_id] = adoption_id
+            accepted.append(adoption_id)
+        elif decisions[adoption_id] == 'reject':
+            rejected.append(adoption_id)
+            rejected_per_animal[animal_id] += 1
+        else:
+            superseded.append(adoption_id)
+    skipped.extend(sorted(set(decisions) - {row.id for row in rows}))
+
+    execution_options = {'synchronize_session': False}
+    if accepted:
+        db.session.execute(
+            update(Adoption).where(Adoption.id.in_(accepted)).values(status='accepted'), execution_options=execution_options)
+        db.session.execute(
+            update(Adoption).where(Adoption.animal_id.in_(adopted), Adoption.status == 'pending')
+            .values(status='rejected_adopted'), execution_options=execution_options)
+    if rejected:
+        db.session.execute(
+            update(Adoption).where(Adoption.id.in_(rejected)).values(status='rejected'), execution_options=execution_options)
+
+    # Новые статусы и счётчики считаются по заблокированным строкам, без COUNT по заявкам
+    animals, changes = {}, []
+    for animal_id, (status, pending_count) in locked.items():
+        if animal_id in adopted:
+            new_status, new_pending = 'adopted', 0
+        else:
+            new_pending = max(0, pending_count - rejected_per_animal[animal_id])
+            new_status = 'available' if status == 'adoption' and new_pending == 0 else status
+        animals[animal_id] = (status, new_status)
+        if (new_status, new_pending) != (status, pending_count):
+            changes.append({'id': animal_id, 'status': new_status, 'pending_count': new_pending})
+    if changes:
+        db.session.execute(update(Animal), changes)
+
+    # Объекты в сессии могли устареть после UPDATE в обход ORM
+    db.session.expire_all()
+    return ModerationResult(accepted, rejected, superseded, skipped, animals)
+
+
+def moderation_queue_keys():
+    """Ключ очереди модерации: (application_date DESC, id DESC), читается по индексу ix_adoptions_queue."""
+    return [(Adoption.application_date, True), (Adoption.id, True)]
+
+
+def moderation_queue_page(after=None, before=None, per_page=25):
+    """Страница ожидающих заявок по всем животным вместе с животным и пользователем одним запросом."""
+    stmt = (
+        db.select(Adoption)
+        .where(Adoption.status == 'pending')
+        .options(
+            joinedload(Adoption.animal).load_only(Animal.name, Animal.breed, Animal.status),
+            joinedload(Adoption.user).load_only(User.login, User.last_name, User.first_name, User.middle_name),
+        )
+    )
+    return keyset_paginate(
+        stmt, moderation_queue_keys(), lambda adoption: (adoption.application_date, adoption.id),
+        after=after, before=before, per_page=per_page
+    )
+
+
+def moderation_queue_rows(batch_size=1000):
+    """
+    Все ожидающие заявки плоскими строками для выгрузки в CSV. Строки читаются
+    с сервера порциями по batch_size (yield_per), а не загружаются целиком.
+    """
+    stmt = (
+        db.select(Adoption.id, Adoption.application_date, Animal.id.label('animal_id'), Animal.name,
+                  User.login, User.last_name, User.first_name, Adoption.contact_info)
+        .join(Animal, Animal.id == Adoption.animal_id)
+        .join(User, User.id == Adoption.user_id)
+        .where(Adoption.status == 'pending')
+        .order_by(Adoption.application_date.desc(), Adoption.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.session.execute(stmt)
@@ -0,0 +1,156 @@
+# app/api.py
+
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from flask import Blueprint, current_app, request, url_for, make_response, jsonify
+from app import db
+from app.models import Animal, Photo
+from app.queries import catalogue_page
+from app.facets import parse_filters
+from app.cache import catalogue_cache, animal_tag, CATALOGUE_TAG
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+# Ссылки в документах относительные: документы кэшируются для всех клиентов, и адрес
+# из заголовка Host одного запроса (в том числе подделанного) не должен попасть к остальным
+def photo_url(filename):
+    return url_for('routes.uploaded_file', filename=filename)
+
+
+def serialize_variants(variants):
+    return [dict(format=v['format'], width=v['width'], height=v['height'], url=photo_url(v['filename']))
+            for v in variants or []]
+
+
+def serialize_photo(photo):
+    return dict(id=photo.id, url=photo_url(photo.filename), width=photo.width, height=photo.height,
+                variants=serialize_variants(photo.variants))
+
+
+# Поля животного: имя -> функция, вычисляющая значение. id возвращается всегда.
+COMMON_FIELDS = {
+    'name': lambda animal: animal.name,
+    'breed': lambda animal: animal.breed,
+    'age_in_months': lambda animal: animal.age_in_months,
+    'gender': lambda animal: animal.gender,
+    'status': lambda animal: animal.status,
+    'created_at': lambda animal: animal.created_at.isoformat() if animal.created_at else None,
+    'adoption_count': lambda animal: animal.adoption_count,
+}
+LIST_FIELDS = dict(COMMON_FIELDS, cover=lambda animal: animal.cover_photo and dict(
+    url=photo_url(animal.cover_photo), variants=serialize_variants(animal.cover_variants)))
+DETAIL_FIELDS = dict(
+    COMMON_FIELDS,
+    description=lambda animal: animal.description,
+    description_html=lambda animal: animal.description_html,
+    photos=lambda animal: [serialize_photo(photo) for photo in animal.photos.order_by(Photo.id)],
+)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def selected_fields(available):
+    """Поля из параметра fields=name,status; без него - все поля ресурса."""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip() and name.strip() != 'id']
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise BadRequest(f"Неизвестные поля: {', '.join(unknown)}. Доступны: id, {', '.join(available)}.")
+    return names
+
+
+def serialize(animal, fields, available):
+    data = {'id': animal.id}
+    for name in fields:
+        data[name] = available[name](animal)
+    return data
+
+
+class CachedDocument:
+    """Готовый ответ API: тело, его gzip-версия, ETag и время формирования."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.gzipped = None
+        if len(self.body) >= current_app.config['API_GZIP_MIN_SIZE']:
+            self.gzipped = gzip.compress(self.body, compresslevel=6)
+
+
+def document_response(document):
+    """Ответ с ETag/Last-Modified: 304 на If-None-Match/If-Modified-Since, gzip по Accept-Encoding."""
+    use_gzip = document.gzipped is not None and 'gzip' in request.accept_encodings
+    response = make_response(document.gzipped if use_gzip else document.body)
+    response.mimetype = 'application/json'
+    if use_gzip:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # Слабый ETag: одинаков для сжатого и несжатого представления
+    response.set_etag(document.etag, weak=True)
+    response.last_modified = document.last_modified
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def api_error(status, message):
+    return jsonify(error=message), status
+
+
+@bp.route('/animals')
+def list_animals():
+    try:
+        fields = selected_fields(LIST_FIELDS)
+    except BadRequest as e:
+        return api_error(400, str(e))
+    filters = parse_filters(request.args)
+    per_page = min(request.args.get('per_page', current_app.config['API_PER_PAGE'], type=int),
+                   current_app.config['API_MAX_PER_PAGE'])
+    per_page = max(per_page, 1)
+    key = ('api', 'animals', tuple(sorted(filters.items())), tuple(fields), per_page,
+           request.args.get('after'), request.args.get('before'))
+
+    document = catalogue_cache.get(key)
+    if document is None:
+        animals = catalogue_page(after=request.args.get('after'), before=request.args.get('before'),
+                                 per_page=per_page, filters=filters)
+        params = dict(filters, per_page=per_page)
+        if request.args.get('fields'):
+            params['fields'] = ','.join(fields)
+        document = CachedDocument({
+            'data': [serialize(animal, fields, LIST_FIELDS) for animal in animals.items],
+            'links': {
+                'next': url_for('api.list_animals', after=animals.next_cursor, **params)
+                if animals.has_next else None,
+                'prev': url_for('api.list_animals', before=animals.prev_cursor, **params)
+                if animals.has_prev else None,
+            },
+        })
+        catalogue_cache.set(key, document, tags=[CATALOGUE_TAG] + [animal_tag(animal.id) for animal in animals.items])
+    return document_response(document)
+
+
+@bp.route('/animals/<int:animal_id>')
+def get_animal(animal_id):
+    try:
+        fields = selected_fields(DETAIL_FIELDS)
+    except BadRequest as e:
+        return api_error(400, str(e))
+    key = ('api', 'animal', animal_id, tuple(fields))
+
+    document = catalogue_cache.get(key)
+    if document is None:
+        animal = db.session.get(Animal, animal_id)
+        if animal is None:
+            return api_error(404, 'Животное не найдено.')
+        document = CachedDocument({'data': serialize(animal, fields, DETAIL_FIELDS)})
+        catalogue_cache.set(key, document, tags=[animal_tag(animal_id)])
+    return document_response(document)
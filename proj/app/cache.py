@@ -0,0 +1,153 @@
+# app/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, has_request_context
+from flask_login import current_user
+from app.replicas import REPLICA_BIND
+
+# Тег, которым помечаются все страницы каталога: сбрасывается, когда меняется порядок животных
+CATALOGUE_TAG = 'catalogue'
+
+
+def animal_tag(animal_id):
+    return f'animal:{animal_id}'
+
+
+def entry_ttl(ttl):
+    """
+    Срок жизни новой записи. Запрос, читающий с реплики, мог увидеть данные до
+    последнего commit (инвалидация уже прошла), поэтому его записи живут не дольше
+    допустимого отставания REPLICA_MAX_LAG_SECONDS.
+    """
+    if has_request_context() and g.get('db_route') == REPLICA_BIND:
+        return min(ttl, current_app.config['REPLICA_MAX_LAG_SECONDS'])
+    return ttl
+
+
+class TaggedLRUCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса с TTL и тегами для точечной инвалидации.
+
+    Каждый воркер gunicorn держит свой экземпляр, поэтому после изменения данных
+    другие воркеры увидят их не позже чем через TTL.
+    """
+
+    def __init__(self, max_size=512, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tags=()):
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + entry_ttl(self.ttl), tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_set(self, key, factory, tags=()):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, tags)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+catalogue_cache = TaggedLRUCache()
+
+# Пользователи вместе с ролью для Flask-Login (см. load_user в app/models.py)
+identity_cache = TaggedLRUCache(max_size=1024, ttl=60)
+
+
+def init_cache(app):
+    catalogue_cache.configure(app.config['CATALOGUE_CACHE_SIZE'], app.config['CATALOGUE_CACHE_TTL'])
+    identity_cache.configure(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL'])
+
+
+def role_tag(role_id):
+    return f'role:{role_id}'
+
+
+def viewer_class():
+    """Класс зрителя, от которого зависит разметка каталога: аноним, user, moderator или admin."""
+    if not current_user.is_authenticated:
+        return 'anonymous'
+    from app.permissions import role_table
+    return role_table().name_of(current_user.role_id)
+
+
+def invalidate_animal(animal_id, reorder=False):
+    """
+    Сбрасывает карточку животного и страницы каталога, на которых оно показано.
+    При reorder=True (добавление, удаление, смена статуса или фильтруемого поля)
+    меняются порядок и состав страниц, поэтому сбрасываются все страницы каталога
+    и счётчики фильтров.
+    """
+    catalogue_cache.invalidate_tag(animal_tag(animal_id))
+    if reorder:
+        catalogue_cache.invalidate_tag(CATALOGUE_TAG)
@@ -0,0 +1,154 @@
+# app/cli.py
+
+import json
+import signal
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, update
+from app import db
+from app.models import Animal, Adoption
+from app.adoptions import lock_animals
+from app.jobs import Worker, job_metrics, queue_stats, purge_finished_jobs
+from app.seed import seed_database, SEED_PASSWORD
+from app.sanitize import render_markdown
+from app.search import rebuild_index
+from app.cache import catalogue_cache
+
+
+@click.command('backfill-descriptions')
+@click.option('--batch-size', default=500, show_default=True, help='Сколько животных обрабатывать за одну транзакцию.')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Перерендерить все описания, а не только пустые.')
+@with_appcontext
+def backfill_descriptions_command(batch_size, rebuild_all):
+    """Заполняет animals.description_html для уже существующих животных."""
+    last_id = 0
+    processed = 0
+    while True:
+        stmt = db.select(Animal.id, Animal.description).where(Animal.id > last_id)
+        if not rebuild_all:
+            stmt = stmt.where(Animal.description_html.is_(None))
+        rows = db.session.execute(stmt.order_by(Animal.id).limit(batch_size)).all()
+        if not rows:
+            break
+
+        db.session.execute(update(Animal), [
+            {'id': row.id, 'description_html': render_markdown(row.description)} for row in rows
+        ])
+        db.session.commit()
+
+        last_id = rows[-1].id
+        processed += len(rows)
+        click.echo(f'Обработано описаний: {processed}')
+
+    click.echo(f'Готово. Всего обновлено: {processed}.')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Полностью перестраивает поисковый индекс животных."""
+    count = rebuild_index()
+    click.echo(f'Поисковый индекс перестроен. Животных в индексе: {count}.')
+
+
+@click.command('check-adoption-counters')
+@click.option('--batch-size', default=1000, show_default=True, help='Сколько животных сверять за одну транзакцию.')
+@click.option('--repair', is_flag=True, help='Исправить найденные расхождения.')
+@with_appcontext
+def check_adoption_counters_command(batch_size, repair):
+    """
+    Сверяет animals.adoption_count и animals.pending_count с таблицей заявок.
+    С --repair строки пачки блокируются, как при модерации, и счётчики
+    пересчитываются одним GROUP BY и пишутся пакетным UPDATE.
+    """
+    last_id = 0
+    checked = mismatched = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(Animal.id).where(Animal.id > last_id).order_by(Animal.id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        if repair:
+            lock_animals(ids)
+        stored = {row.id: (row.adoption_count, row.pending_count) for row in db.session.execute(
+            db.select(Animal.id, Animal.adoption_count, Animal.pending_count).where(Animal.id.in_(ids)))}
+        actual = {row.animal_id: (row.total, row.pending) for row in db.session.execute(
+            db.select(Adoption.animal_id,
+                      func.count(Adoption.id).label('total'),
+                      func.coalesce(func.sum(case((Adoption.status == 'pending', 1), else_=0)), 0).label('pending'))
+            .where(Adoption.animal_id.in_(ids))
+            .group_by(Adoption.animal_id))}
+
+        fixes = []
+        for animal_id in ids:
+            expected = actual.get(animal_id, (0, 0))
+            if stored[animal_id] != expected:
+                click.echo(f'Животное {animal_id}: adoption_count {stored[animal_id][0]} -> {expected[0]}, '
+                           f'pending_count {stored[animal_id][1]} -> {expected[1]}')
+                fixes.append({'id': animal_id, 'adoption_count': expected[0], 'pending_count': expected[1]})
+        if repair and fixes:
+            db.session.execute(update(Animal), fixes)
+        db.session.commit()
+
+        last_id = ids[-1]
+        checked += len(ids)
+        mismatched += len(fixes)
+
+    if repair:
+        click.echo(f'Проверено животных: {checked}, исправлено: {mismatched}.')
+    else:
+        click.echo(f'Проверено животных: {checked}, расхождений: {mismatched}.')
+        if mismatched:
+            raise SystemExit(1)
+
+
+@click.command('worker')
+@click.option('--concurrency', type=int, help='Размер пула потоков (по умолчанию JOB_WORKERS).')
+@click.option('--batch-size', type=int, help='Сколько задач забирать за раз (по умолчанию 2 x concurrency).')
+@click.option('--poll-interval', type=float, help='Пауза при пустой очереди, секунды (по умолчанию JOB_POLL_INTERVAL).')
+@click.option('--until-empty', is_flag=True, help='Завершиться, когда готовых задач не останется.')
+@with_appcontext
+def worker_command(concurrency, batch_size, poll_interval, until_empty):
+    """Выполняет фоновые задачи из таблицы jobs."""
+    app = current_app._get_current_object()
+    worker = Worker(app, concurrency=concurrency, batch_size=batch_size)
+    previous = {signum: signal.signal(signum, lambda *args: worker.stop())
+                for signum in (signal.SIGINT, signal.SIGTERM)}
+    purged = purge_finished_jobs(app.config['JOB_RETENTION_SECONDS'])
+    click.echo(f'Воркер запущен: потоков {worker.concurrency}, удалено старых задач {purged}.')
+    try:
+        processed = worker.run(poll_interval=poll_interval, until_empty=until_empty)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    click.echo(f'Воркер остановлен. Выполнено задач: {processed}.')
+    click.echo(json.dumps(job_metrics.snapshot(), ensure_ascii=False))
+
+
+@click.command('jobs-stats')
+@with_appcontext
+def jobs_stats_command():
+    """Показывает число задач в очереди по статусам."""
+    click.echo(json.dumps(queue_stats(), ensure_ascii=False))
+
+
+@click.command('seed')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--animals', default=1000, show_default=True)
+@click.option('--photos-per-animal', default=2.0, show_default=True, help='Среднее число фото на животное.')
+@click.option('--adoptions', default=5000, show_default=True)
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Зерно генератора: одинаковое даёт одинаковые данные.')
+@click.option('--batch-size', default=10000, show_default=True, help='Строк в одной пачке COPY/executemany.')
+@with_appcontext
+def seed_command(users, animals, photos_per_animal, adoptions, random_seed, batch_size):
+    """Заполняет базу синтетическими пользователями, животными, фото и заявками для нагрузочных тестов."""
+    try:
+        totals = seed_database(users, animals, photos_per_animal, adoptions, seed=random_seed,
+                               batch_size=batch_size, log=click.echo)
+    except LookupError as exc:
+        raise click.ClickException(str(exc))
+    catalogue_cache.clear()
+    click.echo(f"Готово: {json.dumps(totals, ensure_ascii=False)}. Пароль всех пользователей: {SEED_PASSWORD}")
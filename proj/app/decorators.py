@@ -3,11 +3,13 @@
 from functools import wraps
 from flask import flash, redirect, url_for
 from flask_login import current_user
+from app.permissions import has_permission
 
-def roles_required(roles):
+def permission_required(permission):
     """
-    Декоратор для проверки, имеет ли текущий пользователь одну из требуемых ролей.
-    :param roles: Список строк с названиями ролей, которым разрешен доступ.
+    Декоратор для проверки права текущего пользователя по таблице ролей в памяти,
+    без запросов к БД и без обращения к связи user.role.
+    :param permission: значение Permission.
     """
     def decorator(f):
         @wraps(f)
@@ -16,10 +18,10 @@ def roles_required(roles):
                 flash('Для выполнения данного действия необходимо пройти процедуру аутентификации.', 'warning')
                 return redirect(url_for('routes.login'))
 
-            if current_user.role.name not in roles:
+            if not has_permission(current_user, permission):
                 flash('У вас недостаточно прав для выполнения данного действия.', 'danger')
                 return redirect(url_for('routes.index'))
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
\ No newline at end of file
@@ -0,0 +1,86 @@
+# app/engine.py
+
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+from app.metrics import metrics
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool, который пишет в реестр метрик время ожидания соединения,
+    случаи исчерпания пула (все соединения и overflow заняты) и таймауты.
+    """
+
+    def _do_get(self):
+        exhausted = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        if exhausted:
+            metrics.inc('db.pool.exhausted')
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            metrics.inc('db.pool.timeouts')
+            raise
+        finally:
+            metrics.observe('db.pool.checkout_wait', time.perf_counter() - started)
+
+
+# Оборот соединений: открытые, закрытые и признанные негодными (в том числе pre-ping и recycle)
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    metrics.inc('db.pool.connections_opened')
+
+
+@event.listens_for(InstrumentedQueuePool, 'close')
+def _on_close(dbapi_connection, connection_record):
+    metrics.inc('db.pool.connections_closed')
+
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    metrics.inc('db.pool.connections_invalidated')
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.inc('db.pool.checkouts')
+
+
+def engine_options(config):
+    """
+    Параметры create_engine из настроек DB_*. Размер пула и overflow задаются
+    только для баз с QueuePool (не для SQLite в памяти), таймаут выражения -
+    только для PostgreSQL. Явно заданные SQLALCHEMY_ENGINE_OPTIONS важнее.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if not (uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:')):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+        )
+    if uri.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def register_pool_gauges(app, db):
+    """Текущее состояние пула движка приложения в снимке метрик."""
+    def pool_status(attribute):
+        def read():
+            with app.app_context():
+                pool = db.engine.pool
+                return getattr(pool, attribute)() if hasattr(pool, attribute) else None
+        return read
+
+    metrics.gauge('db.pool.size', pool_status('size'))
+    metrics.gauge('db.pool.checked_out', pool_status('checkedout'))
+    metrics.gauge('db.pool.overflow', pool_status('overflow'))
@@ -0,0 +1,123 @@
+# app/facets.py
+
+from collections import Counter, namedtuple
+from sqlalchemy import and_, case, func
+from app import db
+from app.models import Animal
+from app.cache import catalogue_cache, CATALOGUE_TAG
+
+STATUS_LABELS = {'available': 'Доступно для усыновления', 'adoption': 'В процессе усыновления', 'adopted': 'Усыновлён'}
+GENDER_LABELS = {'male': 'Мальчик', 'female': 'Девочка'}
+
+# Интервалы возраста в месяцах: (ключ, подпись, от включительно, до не включительно)
+AGE_BUCKETS = (
+    ('baby', 'до 6 мес.', None, 6),
+    ('young', '6–12 мес.', 6, 12),
+    ('adult', '1–3 года', 12, 36),
+    ('mature', '3–7 лет', 36, 84),
+    ('senior', 'старше 7 лет', 84, None),
+)
+AGE_LABELS = {key: label for key, label, _, _ in AGE_BUCKETS}
+
+FIXED_LABELS = {'status': STATUS_LABELS, 'gender': GENDER_LABELS, 'age': AGE_LABELS}
+FACET_TITLES = (('status', 'Статус'), ('gender', 'Пол'), ('age', 'Возраст'), ('breed', 'Порода'))
+
+# Сколько пород показывать в фильтре (самые частые)
+BREED_LIMIT = 15
+
+Facet = namedtuple('Facet', ['name', 'title', 'options'])
+FacetOption = namedtuple('FacetOption', ['value', 'label', 'count', 'selected'])
+
+
+def _age_range(key):
+    for bucket_key, _, low, high in AGE_BUCKETS:
+        if bucket_key == key:
+            return low, high
+    return None
+
+
+def age_bucket_expression():
+    return case(
+        *[(Animal.age_in_months < high, key) for key, _, _, high in AGE_BUCKETS if high is not None],
+        else_=AGE_BUCKETS[-1][0]
+    )
+
+
+def parse_filters(args):
+    """Выбирает из параметров запроса допустимые значения фильтров."""
+    filters = {}
+    if args.get('status') in STATUS_LABELS:
+        filters['status'] = args['status']
+    if args.get('gender') in GENDER_LABELS:
+        filters['gender'] = args['gender']
+    if args.get('age') in AGE_LABELS:
+        filters['age'] = args['age']
+    breed = (args.get('breed') or '').strip()
+    if breed:
+        filters['breed'] = breed[:100]
+    return filters
+
+
+def apply_filters(stmt, filters):
+    """Добавляет к запросу животных условия выбранных фильтров."""
+    conditions = []
+    if 'status' in filters:
+        conditions.append(Animal.status == filters['status'])
+    if 'gender' in filters:
+        conditions.append(Animal.gender == filters['gender'])
+    if 'breed' in filters:
+        conditions.append(Animal.breed == filters['breed'])
+    if 'age' in filters:
+        low, high = _age_range(filters['age'])
+        if low is not None:
+            conditions.append(Animal.age_in_months >= low)
+        if high is not None:
+            conditions.append(Animal.age_in_months < high)
+    return stmt.where(and_(*conditions)) if conditions else stmt
+
+
+def _grouped_counts():
+    """Один GROUP BY по всем измерениям фильтров сразу."""
+    age_bucket = age_bucket_expression()
+    return db.session.execute(
+        db.select(Animal.status, Animal.gender, Animal.breed, age_bucket.label('age'), func.count())
+        .group_by(Animal.status, Animal.gender, Animal.breed, age_bucket)
+    ).all()
+
+
+def _compute_facets(filters):
+    groups = [dict(status=status, gender=gender, breed=breed, age=age, count=count)
+              for status, gender, breed, age, count in _grouped_counts()]
+
+    facets, total = [], 0
+    for name, title in FACET_TITLES:
+        # Счётчики значения фильтра учитывают все остальные выбранные фильтры, но не его самого
+        others = {key: value for key, value in filters.items() if key != name}
+        counts = Counter()
+        for group in groups:
+            if all(group[key] == value for key, value in others.items()):
+                counts[group[name]] += group['count']
+        if name == 'status':
+            total = counts[filters['status']] if 'status' in filters else sum(counts.values())
+
+        labels = FIXED_LABELS.get(name)
+        if labels is None:
+            top = [breed for breed, _ in counts.most_common(BREED_LIMIT)]
+            if 'breed' in filters and filters['breed'] not in top:
+                top.append(filters['breed'])
+            labels = {breed: breed for breed in sorted(top)}
+
+        options = [FacetOption(value, label, counts.get(value, 0), filters.get(name) == value)
+                   for value, label in labels.items()]
+        facets.append(Facet(name, title, options))
+    return facets, total
+
+
+def facet_counts(filters):
+    """
+    Фильтры каталога со счётчиками для текущего сочетания фильтров и общее число
+    подходящих животных. Результат кэшируется по сочетанию фильтров и сбрасывается
+    вместе со страницами каталога при изменении животных.
+    """
+    key = ('facets', tuple(sorted(filters.items())))
+    return catalogue_cache.get_or_set(key, lambda: _compute_facets(filters), tags=[CATALOGUE_TAG])
@@ -0,0 +1,121 @@
+# app/images.py
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.models import Photo
+from app.cache import invalidate_animal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow не установлен: варианты не строятся, показываются оригиналы
+    Image = ImageOps = None
+
+# (формат Pillow, расширение файла)
+VARIANT_FORMATS = (('JPEG', 'jpg'), ('WEBP', 'webp'))
+
+
+def build_variants(source_path, upload_folder, stem, widths, quality):
+    """
+    Строит уменьшенные копии изображения в форматах JPEG и WebP.
+    EXIF не переносится (ориентация применяется к пикселям заранее), копии
+    пережимаются с заданным качеством. Увеличение не выполняется.
+
+    :return: (ширина оригинала, высота оригинала, список описаний вариантов)
+    """
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        width, height = image.size
+
+        targets = sorted({min(w, width) for w in widths})
+        variants = []
+        for target_width in targets:
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize(
+                (target_width, target_height), Image.LANCZOS)
+            for image_format, extension in VARIANT_FORMATS:
+                filename = f'variants/{stem}_{target_width}w.{extension}'
+                path = os.path.join(upload_folder, filename)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                resized.save(path, image_format, quality=quality, optimize=True)
+                variants.append({'format': extension, 'width': target_width,
+                                 'height': target_height, 'filename': filename})
+    return width, height, variants
+
+
+def remove_variants(upload_folder, variants):
+    for variant in variants or ():
+        path = os.path.join(upload_folder, variant['filename'])
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def process_photo(photo_id):
+    """Строит варианты для одной фотографии и сохраняет их описание в Photo."""
+    photo = db.session.get(Photo, photo_id)
+    if photo is None or Image is None:
+        return
+    # Такой же файл уже обработан для другого животного - переиспользуем его копии
+    if photo.content_hash is not None:
+        twin = db.session.scalar(db.select(Photo).where(
+            Photo.content_hash == photo.content_hash, Photo.variants.is_not(None), Photo.id != photo.id
+        ).limit(1))
+        if twin is not None:
+            photo.width, photo.height, photo.variants = twin.width, twin.height, twin.variants
+            db.session.commit()
+            invalidate_animal(photo.animal_id)
+            return
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    stem = os.path.splitext(photo.filename)[0]
+    try:
+        width, height, variants = build_variants(
+            os.path.join(upload_folder, photo.filename), upload_folder, stem,
+            current_app.config['IMAGE_VARIANT_WIDTHS'], current_app.config['IMAGE_QUALITY']
+        )
+        photo.width, photo.height, photo.variants = width, height, variants
+        db.session.commit()
+        invalidate_animal(photo.animal_id)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Не удалось обработать фотографию %s', photo_id)
+
+
+class ImagePipeline:
+    """
+    Пул потоков, который обрабатывает загруженные фотографии вне запроса.
+    При IMAGE_WORKERS = 0 обработка выполняется сразу, в том же потоке.
+    """
+
+    def __init__(self):
+        self.executor = None
+
+    def init_app(self, app):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        workers = app.config['IMAGE_WORKERS']
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image') if workers > 0 else None
+
+    def submit(self, photo_ids):
+        app = current_app._get_current_object()
+
+        def run(photo_id):
+            with app.app_context():
+                process_photo(photo_id)
+
+        futures = []
+        for photo_id in photo_ids:
+            if self.executor is None:
+                future = Future()
+                run(photo_id)
+                future.set_result(None)
+            else:
+                future = self.executor.submit(run, photo_id)
+            futures.append(future)
+        return futures
+
+
+image_pipeline = ImagePipeline()
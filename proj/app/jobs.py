@@ -0,0 +1,221 @@
+# app/jobs.py
+
+import logging
+import random
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Обработчики задач по виду: kind -> функция(payload). Задача может выполниться
+# больше одного раза (повтор после сбоя воркера), поэтому обработчики идемпотентны.
+HANDLERS = {}
+
+
+def job_handler(kind):
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+
+def enqueue(kind, payload, idempotency_key=None, delay=0, max_attempts=None):
+    """
+    Ставит задачу в очередь в текущей транзакции; она станет видна воркеру
+    только после commit, а при rollback исчезнет вместе с остальными изменениями.
+    Повторная постановка с тем же idempotency_key ничего не делает.
+    """
+    values = dict(
+        kind=kind, payload=payload, idempotency_key=idempotency_key, status='queued', attempts=0,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay), created_at=datetime.utcnow(),
+    )
+    dialect = db.engine.dialect.name
+    if idempotency_key is not None and dialect in ('postgresql', 'sqlite'):
+        insert = pg_insert if dialect == 'postgresql' else sqlite_insert
+        db.session.execute(insert(Job).values(**values).on_conflict_do_nothing(index_elements=['idempotency_key']))
+    elif idempotency_key is None or not db.session.scalar(
+            db.select(Job.id).where(Job.idempotency_key == idempotency_key)):
+        db.session.add(Job(**values))
+
+
+def backoff_delay(attempts, base, maximum):
+    """Экспоненциальная задержка перед повтором с разбросом ±25%, чтобы повторы не шли пачкой."""
+    delay = min(maximum, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+
+class JobMetrics:
+    """Счётчики воркера в памяти процесса: запуски, успехи, повторы, окончательные ошибки и время по видам задач."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counters = Counter()
+        self.durations = Counter()
+
+    def record(self, kind, outcome, duration):
+        with self.lock:
+            self.counters[outcome] += 1
+            self.counters[f'{kind}:{outcome}'] += 1
+            self.durations[kind] += duration
+
+    def snapshot(self):
+        with self.lock:
+            return {'counters': dict(self.counters), 'seconds': dict(self.durations)}
+
+
+job_metrics = JobMetrics()
+
+
+def queue_stats():
+    """Число задач в очереди по статусам одним GROUP BY."""
+    return dict(db.session.execute(db.select(Job.status, db.func.count(Job.id)).group_by(Job.status)).all())
+
+
+class Worker:
+    """
+    Забирает готовые задачи пачками и выполняет их в пуле потоков.
+
+    Задачи забираются одним UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED),
+    поэтому несколько воркеров не возьмут одну задачу. Задача, застрявшая в статусе
+    running дольше JOB_LEASE_SECONDS (воркер упал), забирается снова, если попытки
+    не исчерпаны, иначе помечается failed. Каждый захват получает свой токен в
+    locked_by: итог записывает только воркер, который владеет задачей сейчас.
+    """
+
+    def __init__(self, app, concurrency=None, batch_size=None):
+        self.app = app
+        self.concurrency = concurrency or app.config['JOB_WORKERS']
+        self.batch_size = batch_size or self.concurrency * 2
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job')
+        self.stopping = threading.Event()
+
+    def fail_exhausted_leases(self, now, lease_expired):
+        """Задачи, которые раз за разом роняют воркер, не перезапускаются бесконечно."""
+        failed = db.session.execute(
+            update(Job)
+            .where(Job.status == 'running', Job.locked_at < lease_expired, Job.attempts >= Job.max_attempts)
+            .values(status='failed', finished_at=now, locked_by=None, locked_at=None,
+                    last_error='Аренда истекла на последней попытке: воркер не завершил задачу'),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if failed:
+            logger.error('Задач с истёкшей арендой и исчерпанными попытками: %s', failed)
+
+    def claim(self):
+        """Забирает пачку задач; каждая строка содержит токен захвата locked_by."""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.app.config['JOB_LEASE_SECONDS'])
+        self.fail_exhausted_leases(now, lease_expired)
+        ready = (
+            db.select(Job.id)
+            .where(or_(
+                (Job.status == 'queued') & (Job.run_at <= now),
+                (Job.status == 'running') & (Job.locked_at < lease_expired) & (Job.attempts < Job.max_attempts),
+            ))
+            .order_by(Job.run_at, Job.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        db.session.execute(
+            update(Job)
+            .where(Job.id.in_(ready.scalar_subquery()), Job.status.in_(('queued', 'running')))
+            .values(status='running', locked_by=token, locked_at=now, attempts=Job.attempts + 1),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return db.session.execute(
+            db.select(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.locked_by)
+            .where(Job.locked_by == token, Job.status == 'running')
+            .order_by(Job.run_at, Job.id)
+        ).all()
+
+    def run_job(self, job):
+        with self.app.app_context():
+            started = time.perf_counter()
+            try:
+                handler = HANDLERS.get(job.kind)
+                if handler is None:
+                    raise LookupError(f'Нет обработчика для задачи {job.kind!r}')
+                handler(job.payload)
+                db.session.rollback()
+                values, outcome = dict(status='done', finished_at=datetime.utcnow(), last_error=None), 'succeeded'
+            except Exception:
+                db.session.rollback()
+                error = traceback.format_exc(limit=5)
+                if job.attempts >= job.max_attempts:
+                    values, outcome = dict(status='failed', finished_at=datetime.utcnow(), last_error=error), 'failed'
+                    logger.error('Задача %s #%s окончательно упала: %s', job.kind, job.id, error)
+                else:
+                    delay = backoff_delay(job.attempts, self.app.config['JOB_BACKOFF_BASE'],
+                                          self.app.config['JOB_BACKOFF_MAX'])
+                    values = dict(status='queued', run_at=datetime.utcnow() + timedelta(seconds=delay), last_error=error)
+                    outcome = 'retried'
+            # Пока задача выполнялась, аренда могла истечь и задачу забрал другой воркер:
+            # тогда её состояние принадлежит ему, и итог этого запуска не записывается
+            owned = db.session.execute(
+                update(Job).where(Job.id == job.id, Job.locked_by == job.locked_by)
+                .values(locked_by=None, locked_at=None, **values),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            db.session.commit()
+            db.session.remove()
+            if not owned:
+                logger.warning('Задача %s #%s: аренда потеряна, итог запуска отброшен', job.kind, job.id)
+                outcome = 'lease_lost'
+            job_metrics.record(job.kind, outcome, time.perf_counter() - started)
+
+    def run_once(self):
+        """Забирает и выполняет одну пачку; возвращает число выполненных задач."""
+        with self.app.app_context():
+            jobs = self.claim()
+            db.session.remove()
+        for future in [self.executor.submit(self.run_job, job) for job in jobs]:
+            future.result()
+        return len(jobs)
+
+    def run(self, poll_interval=None, until_empty=False):
+        poll_interval = poll_interval if poll_interval is not None else self.app.config['JOB_POLL_INTERVAL']
+        total = 0
+        while not self.stopping.is_set():
+            done = self.run_once()
+            total += done
+            if not done:
+                if until_empty:
+                    break
+                self.stopping.wait(poll_interval)
+        self.executor.shutdown(wait=True)
+        return total
+
+    def stop(self):
+        self.stopping.set()
+
+
+def purge_finished_jobs(older_than):
+    """Удаляет выполненные задачи старше older_than секунд (вместе с ними освобождаются их ключи идемпотентности)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    result = db.session.execute(db.delete(Job).where(Job.status == 'done', Job.finished_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+@job_handler('remove_files')
+def remove_files_job(payload):
+    """Удаляет с диска файлы фотографий, на которые не осталось ссылок (см. release_photos)."""
+    from app.storage import remove_orphaned_files
+    remove_orphaned_files(current_app.config['UPLOAD_FOLDER'], payload['files'])
@@ -0,0 +1,74 @@
+# app/metrics.py
+
+import threading
+from collections import defaultdict
+
+# Границы гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self):
+        labels = [f'le_{bound}' for bound in self.buckets] + ['inf']
+        return {'count': self.count, 'sum': self.sum, 'max': self.max, 'buckets': dict(zip(labels, self.counts))}
+
+
+class MetricsRegistry:
+    """
+    Счётчики, гистограммы и вычисляемые показатели в памяти процесса.
+    Каждый воркер gunicorn ведёт свои значения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gauges = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = defaultdict(int)
+            self.histograms = {}
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name, fn):
+        """Показатель, значение которого вычисляется fn() в момент снимка."""
+        self.gauges[name] = fn
+
+    def snapshot(self):
+        with self.lock:
+            data = {
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+        data['gauges'] = {name: fn() for name, fn in list(self.gauges.items())}
+        return data
+
+
+metrics = MetricsRegistry()
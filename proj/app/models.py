@@ -1,9 +1,14 @@
 # app/models.py
 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
 from flask_login import UserMixin
 from app import db, login_manager
+from app.sanitize import clean_markdown, render_markdown
+from app.cache import identity_cache, role_tag
+from app.permissions import role_table, mark_stale
+from app.passwords import password_hasher
 
 # Таблица ролей
 class Role(db.Model):
@@ -29,45 +34,136 @@ class User(UserMixin, db.Model):
     adoptions = db.relationship('Adoption', backref='user', lazy='dynamic', cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def rehash_password(self, password):
+        """Перехэширует пароль, если его хэш создан с устаревшими параметрами. Вызывать после check_password."""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
 
     @property
     def is_admin(self):
-        return self.role.name == 'admin'
+        return role_table().name_of(self.role_id) == 'admin'
 
     @property
     def is_moderator(self):
-        return self.role.name == 'moderator'
+        return role_table().name_of(self.role_id) == 'moderator'
 
     def __repr__(self):
         return f'<User {self.login}>'
 
-# Загрузчик пользователей для Flask-Login
+# Загрузчик пользователей для Flask-Login: пользователь и роль одним запросом,
+# затем из кэша процесса. Закэшированный объект отсоединён от сессии, поэтому
+# в нём доступны только загруженные колонки и роль.
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    user = identity_cache.get(user_id)
+    if user is None:
+        user = db.session.scalar(db.select(User).options(joinedload(User.role)).where(User.id == user_id))
+        if user is None:
+            return None
+        db.session.expunge(user)
+        identity_cache.set(user_id, user, tags=[role_tag(user.role_id)])
+    return user
+
+
+# Сброс кэша пользователей и таблицы прав после commit, изменившего пользователя или роль
+@event.listens_for(db.session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    pending = session.info.setdefault('identity_changes', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            pending.add(('user', obj.id))
+        elif isinstance(obj, Role):
+            pending.add(('role', obj.id))
+    if any(isinstance(obj, Role) for obj in session.new):
+        pending.add(('role', None))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_identities(session):
+    for kind, obj_id in session.info.pop('identity_changes', ()):
+        if kind == 'user':
+            identity_cache.invalidate(obj_id)
+        else:
+            identity_cache.invalidate_tag(role_tag(obj_id))
+            mark_stale()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_identity_changes(session):
+    session.info.pop('identity_changes', None)
+
+# Ранг статуса в каталоге: сначала доступные, затем в процессе, затем усыновлённые
+STATUS_RANK = {'available': 1, 'adoption': 2, 'adopted': 3}
+UNKNOWN_STATUS_RANK = 4
+
+STATUS_RANK_SQL = 'CASE status {} ELSE {} END'.format(
+    ' '.join(f"WHEN '{status}' THEN {rank}" for status, rank in STATUS_RANK.items()),
+    UNKNOWN_STATUS_RANK
+)
 
 # Таблица животных
 class Animal(db.Model):
     __tablename__ = 'animals'
+    __table_args__ = (
+        # Индекс под сортировку каталога: ранг статуса, затем новые выше
+        db.Index('ix_animals_catalogue_order', 'status_rank', db.text('created_at DESC'), 'id'),
+        # Отфильтрованный по породе или полу каталог в том же порядке
+        db.Index('ix_animals_breed_catalogue', 'breed', 'status_rank', db.text('created_at DESC'), 'id'),
+        db.Index('ix_animals_gender_catalogue', 'gender', 'status_rank', db.text('created_at DESC'), 'id'),
+        db.Index('ix_animals_age_in_months', 'age_in_months'),
+        # Покрывающий индекс для сгруппированного подсчёта фильтров (app/facets.py)
+        db.Index('ix_animals_facets', 'status', 'gender', 'breed', 'age_in_months'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
+    # Готовый санитизированный HTML описания, рендерится один раз при сохранении
+    description_html = db.Column(db.Text)
     age_in_months = db.Column(db.Integer, nullable=False)
     breed = db.Column(db.String(100), nullable=False)
     gender = db.Column(db.String(10), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='available', index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Генерируемая СУБД колонка: всегда совпадает с рангом текущего статуса
+    status_rank = db.Column(db.SmallInteger, db.Computed(STATUS_RANK_SQL, persisted=True))
+    # Денормализованные счётчики заявок: всего и ожидающих решения. Меняются в одной
+    # транзакции с заявками (app/adoptions.py), сверяются командой `flask check-adoption-counters`
+    adoption_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    pending_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     photos = db.relationship('Photo', backref='animal', lazy='dynamic', cascade="all, delete-orphan")
     adoptions = db.relationship('Adoption', backref='animal', lazy='dynamic', cascade="all, delete-orphan")
 
+    # Вычисляемые поля карточки каталога, заполняются запросом из app/queries.py
+    cover_photo = db.query_expression()
+    cover_variants = db.query_expression()
+
+    def set_description(self, text):
+        self.description = clean_markdown(text)
+        self.description_html = render_markdown(self.description)
+
     def __repr__(self):
         return f'<Animal {self.name}>'
 
+# Файлы фотографий, адресуемые хэшем содержимого (один файл на диске может принадлежать нескольким Photo)
+class PhotoBlob(db.Model):
+    __tablename__ = 'photo_blobs'
+    content_hash = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<PhotoBlob {self.filename} refs={self.ref_count}>'
+
 # Таблица фотографий
 class Photo(db.Model):
     __tablename__ = 'photos'
@@ -75,6 +171,16 @@ class Photo(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     mimetype = db.Column(db.String(255), nullable=False)
     animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('photo_blobs.content_hash'), index=True)
+    # Связь нужна unit of work: INSERT photo_blobs идёт до INSERT photos, а DELETE - после
+    blob = db.relationship(PhotoBlob)
+    # Размеры оригинала и уменьшенные копии (заполняются фоновой обработкой, см. app/images.py)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.Column(db.JSON(none_as_null=True))
+
+    def variants_of(self, image_format):
+        return [v for v in self.variants or () if v['format'] == image_format]
 
     def __repr__(self):
         return f'<Photo {self.filename}>'
@@ -82,6 +188,10 @@ class Photo(db.Model):
 # Таблица усыновлений (заявок)
 class Adoption(db.Model):
     __tablename__ = 'adoptions'
+    __table_args__ = (
+        # Очередь модерации: ожидающие заявки по всем животным, новые выше
+        db.Index('ix_adoptions_queue', 'status', 'application_date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     animal_id = db.Column(db.Integer, db.ForeignKey('animals.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -90,4 +200,30 @@ class Adoption(db.Model):
     contact_info = db.Column(db.String(255), nullable=False)
 
     def __repr__(self):
-        return f'<Adoption user_id={self.user_id} animal_id={self.animal_id}>'
\ No newline at end of file
+        return f'<Adoption user_id={self.user_id} animal_id={self.animal_id}>'
+
+
+# Фоновые задачи (app/jobs.py): очередь хранится в той же БД, что и данные,
+# поэтому задача ставится в одной транзакции с изменением, которое её породило
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Выборка готовых к запуску задач воркером
+        db.Index('ix_jobs_ready', 'status', 'run_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    idempotency_key = db.Column(db.String(128), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.kind} #{self.id} {self.status}>'
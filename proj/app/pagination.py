@@ -0,0 +1,169 @@
+# app/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, func, text
+from app import db
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачную строку для URL."""
+    packed = [['d', v.isoformat()] if isinstance(v, datetime) else ['v', v] for v in values]
+    raw = json.dumps(packed, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _cursor_value(item):
+    """Значение из упакованного курсора: пара ['d', ISO-дата] или ['v', число/строка/null]."""
+    if not isinstance(item, list) or len(item) != 2:
+        raise ValueError('неверный элемент курсора')
+    kind, value = item
+    if kind == 'd' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if kind == 'v' and (value is None or isinstance(value, (int, float, str)) and not isinstance(value, bool)):
+        return value
+    raise ValueError('неверный элемент курсора')
+
+
+def _matches_column(column, value):
+    """Подходит ли значение курсора к типу колонки ключа (чтобы не сравнивать дату со строкой)."""
+    if value is None:
+        return True
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return True
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def decode_cursor(token, keys=None):
+    """
+    Распаковывает курсор. Для повреждённого или подделанного курсора возвращает None:
+    курсор должен быть списком скаляров, а с keys - ровно по одному значению
+    подходящего типа на каждую колонку ключа.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        packed = json.loads(raw)
+        if not isinstance(packed, list):
+            return None
+        values = tuple(_cursor_value(item) for item in packed)
+    except (ValueError, TypeError):
+        return None
+    if keys is not None:
+        if len(values) != len(keys):
+            return None
+        if not all(_matches_column(column, value) for (column, _), value in zip(keys, values)):
+            return None
+    return values
+
+
+def _seek_condition(keys, values, forward):
+    """
+    Условие "строго после (или до) курсора" для лексикографического порядка,
+    в котором каждая колонка может сортироваться по возрастанию или убыванию.
+    """
+    alternatives = []
+    for i, ((column, descending), value) in enumerate(zip(keys, values)):
+        goes_lower = descending if forward else not descending
+        step = column < value if goes_lower else column > value
+        equal_prefix = [keys[j][0] == values[j] for j in range(i)]
+        alternatives.append(and_(*equal_prefix, step))
+    return or_(*alternatives)
+
+
+def _order_by(keys, forward):
+    clauses = []
+    for column, descending in keys:
+        if descending == forward:
+            clauses.append(column.desc())
+        else:
+            clauses.append(column.asc())
+    return clauses
+
+
+def approximate_count(model):
+    """
+    Приблизительное число строк в таблице модели. На PostgreSQL берётся из
+    статистики планировщика (pg_class.reltuples), на остальных СУБД - точный COUNT.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.scalar(
+            text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+            {'table': model.__tablename__}
+        )
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.session.scalar(db.select(func.count()).select_from(model))
+
+
+class KeysetPage:
+    """
+    Страница, полученная курсорной (keyset) пагинацией. Вместо номеров страниц
+    хранит курсоры соседних страниц, поэтому не требует OFFSET и COUNT(*).
+    """
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def keyset_paginate(query, keys, key_of, after=None, before=None, per_page=20, total=None):
+    """
+    Курсорная пагинация запроса.
+
+    :param query: select() без ORDER BY, LIMIT и OFFSET.
+    :param keys: список пар (выражение, по убыванию ли), однозначно упорядочивающий строки.
+    :param key_of: функция, возвращающая кортеж значений ключа для объекта страницы.
+    :param after: курсор, после которого начинается страница (переход вперёд).
+    :param before: курсор, перед которым заканчивается страница (переход назад).
+    :param total: готовое (например, приблизительное) общее количество, если нужно.
+    """
+    after_values = decode_cursor(after, keys)
+    before_values = decode_cursor(before, keys) if after_values is None else None
+    forward = before_values is None
+    cursor_values = after_values if forward else before_values
+
+    stmt = query
+    if cursor_values is not None:
+        stmt = stmt.where(_seek_condition(keys, cursor_values, forward))
+    stmt = stmt.order_by(*_order_by(keys, forward)).limit(per_page + 1)
+
+    items = db.session.scalars(stmt).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if not forward:
+        items.reverse()
+
+    if forward:
+        has_next, has_prev = has_more, cursor_values is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_next:
+            next_cursor = encode_cursor(key_of(items[-1]))
+        if has_prev:
+            prev_cursor = encode_cursor(key_of(items[0]))
+
+    return KeysetPage(items, next_cursor, prev_cursor, per_page, total=total)
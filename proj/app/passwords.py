@@ -0,0 +1,62 @@
+# app/passwords.py
+
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Параметры KDF по умолчанию в werkzeug, которые он не пишет в короткое имя метода
+SCRYPT_DEFAULTS = ('32768', '8', '1')
+PBKDF2_DEFAULTS = ('sha256', '600000')
+
+
+def canonical_method(method):
+    """Полное имя метода в том виде, в каком werkzeug записывает его в хэш: 'scrypt' -> 'scrypt:32768:8:1'."""
+    name, *params = method.split(':')
+    defaults = {'scrypt': SCRYPT_DEFAULTS, 'pbkdf2': PBKDF2_DEFAULTS}.get(name)
+    if defaults is None:
+        return method
+    return ':'.join([name, *params, *defaults[len(params):]])
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей в пуле из PASSWORD_HASH_WORKERS потоков.
+    scrypt и pbkdf2 отпускают GIL, поэтому пул ограничивает одновременную
+    нагрузку на процессор и память, а не сериализует запросы.
+    При PASSWORD_HASH_WORKERS = 0 вычисление идёт в потоке запроса.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.method = canonical_method('scrypt')
+        self.salt_length = 16
+
+    def init_app(self, app):
+        self.configure(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_SALT_LENGTH'],
+                       app.config['PASSWORD_HASH_WORKERS'])
+
+    def configure(self, method, salt_length, workers):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.method = canonical_method(method)
+        self.salt_length = salt_length
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password') if workers > 0 else None
+
+    def _run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        return self.executor.submit(fn, *args).result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Хэш создан с другим методом, параметрами KDF или длиной соли."""
+        method, _, rest = password_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self.method or len(salt) != self.salt_length
+
+
+password_hasher = PasswordHasher()
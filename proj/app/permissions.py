@@ -0,0 +1,87 @@
+# app/permissions.py
+
+import threading
+import time
+from enum import IntFlag
+from types import MappingProxyType
+from flask_login import current_user
+from app import db
+
+
+class Permission(IntFlag):
+    APPLY_FOR_ADOPTION = 1
+    ADD_ANIMAL = 2
+    EDIT_ANIMAL = 4
+    DELETE_ANIMAL = 8
+    MODERATE_ADOPTIONS = 16
+
+
+# Права ролей по их названию (роли хранятся в таблице roles, права - здесь)
+ROLE_PERMISSIONS = {
+    'admin': Permission.ADD_ANIMAL | Permission.EDIT_ANIMAL | Permission.DELETE_ANIMAL | Permission.MODERATE_ADOPTIONS,
+    'moderator': Permission.EDIT_ANIMAL | Permission.MODERATE_ADOPTIONS,
+    'user': Permission.APPLY_FOR_ADOPTION,
+}
+
+NO_PERMISSIONS = Permission(0)
+
+
+class RoleTable:
+    """Неизменяемый снимок ролей: id -> название и битовая маска прав, название -> id."""
+
+    def __init__(self, roles):
+        self.names = MappingProxyType({role_id: name for role_id, name in roles})
+        self.ids = MappingProxyType({name: role_id for role_id, name in roles})
+        self.masks = MappingProxyType({role_id: ROLE_PERMISSIONS.get(name, NO_PERMISSIONS) for role_id, name in roles})
+
+    def name_of(self, role_id):
+        return self.names.get(role_id)
+
+    def id_of(self, name):
+        return self.ids.get(name)
+
+    def permissions_of(self, role_id):
+        return self.masks.get(role_id, NO_PERMISSIONS)
+
+
+_table = None
+_loaded_at = 0.0
+_ttl = 300
+_lock = threading.Lock()
+
+
+def init_permissions(app):
+    global _ttl
+    _ttl = app.config['PERMISSIONS_TTL']
+    mark_stale()
+
+
+def mark_stale():
+    """Снимок перечитается из БД при следующем обращении (вызывается после изменения ролей)."""
+    global _table
+    _table = None
+
+
+def role_table():
+    """Текущий снимок ролей; из БД читается один раз на процесс и затем раз в PERMISSIONS_TTL."""
+    global _table, _loaded_at
+    table = _table
+    if table is None or time.monotonic() - _loaded_at > _ttl:
+        with _lock:
+            if _table is None or time.monotonic() - _loaded_at > _ttl:
+                from app.models import Role
+                _table = RoleTable(db.session.execute(db.select(Role.id, Role.name)).all())
+                _loaded_at = time.monotonic()
+            table = _table
+    return table
+
+
+def has_permission(user, permission):
+    if not user.is_authenticated:
+        return False
+    return permission in role_table().permissions_of(user.role_id)
+
+
+def can(permission_name):
+    """Jinja-помощник: {% if can('edit_animal') %} для текущего пользователя."""
+    return has_permission(current_user, Permission[permission_name.upper()])
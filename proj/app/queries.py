@@ -0,0 +1,67 @@
+# app/queries.py
+
+from sqlalchemy.orm import load_only, with_expression
+from app import db
+from app.models import Animal, Photo
+from app.pagination import keyset_paginate, approximate_count
+from app.facets import apply_filters
+
+# Колонки, которые нужны карточке в каталоге (без тяжёлого description)
+CARD_COLUMNS = (
+    Animal.name, Animal.breed, Animal.age_in_months, Animal.gender,
+    Animal.status, Animal.status_rank, Animal.created_at, Animal.adoption_count,
+)
+
+
+def cover_photo_subquery(column=Photo.filename):
+    """Колонка первой (обложечной) фотографии животного: имя файла или её варианты."""
+    return (
+        db.select(column)
+        .where(Photo.animal_id == Animal.id)
+        .order_by(Photo.id)
+        .limit(1)
+        .correlate(Animal)
+        .scalar_subquery()
+    )
+
+
+def catalogue_select():
+    """
+    Карточки каталога без сортировки: животные вместе с обложкой одним SELECT'ом,
+    без загрузки полного описания. Число заявок берётся из animals.adoption_count.
+    """
+    return (
+        db.select(Animal)
+        .options(
+            load_only(*CARD_COLUMNS),
+            with_expression(Animal.cover_photo, cover_photo_subquery()),
+            with_expression(Animal.cover_variants, cover_photo_subquery(Photo.variants)),
+        )
+    )
+
+
+def catalogue_query(filters=None):
+    """Карточки каталога в порядке отображения (для постраничной пагинации)."""
+    stmt = apply_filters(catalogue_select(), filters or {})
+    return stmt.order_by(Animal.status_rank, Animal.created_at.desc(), Animal.id)
+
+
+def catalogue_keys():
+    """
+    Ключ курсорной пагинации каталога: (ранг статуса, created_at DESC, id).
+    Совпадает с индексом ix_animals_catalogue_order, поэтому страница читается по индексу.
+    """
+    return [(Animal.status_rank, False), (Animal.created_at, True), (Animal.id, False)]
+
+
+def catalogue_cursor_key(animal):
+    return (animal.status_rank, animal.created_at, animal.id)
+
+
+def catalogue_page(after=None, before=None, per_page=9, with_total=False, filters=None):
+    """Страница каталога с курсорной пагинацией и, по желанию, приблизительным общим числом."""
+    total = approximate_count(Animal) if with_total and not filters else None
+    return keyset_paginate(
+        apply_filters(catalogue_select(), filters or {}), catalogue_keys(), catalogue_cursor_key,
+        after=after, before=before, per_page=per_page, total=total
+    )
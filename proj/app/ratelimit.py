@@ -0,0 +1,168 @@
+# app/ratelimit.py
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from flask import request
+from werkzeug.exceptions import TooManyRequests
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(value):
+    """'10/minute' -> (10, 60)."""
+    count, _, period = value.partition('/')
+    return int(count), PERIODS[period.strip()]
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend:
+    """
+    Корзины токенов в словаре процесса: у каждого воркера gunicorn свои счётчики.
+    Словарь упорядочен по времени последнего списания; сверх max_keys вытесняются
+    самые давние корзины - за O(1) на запрос даже при потоке запросов с новых адресов.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, keys, capacity, rate, now):
+        """Списывает по токену со всех корзин или ни с одной; возвращает исчерпанный ключ и его ожидание."""
+        with self.lock:
+            levels = {key: _refill(*self.buckets.get(key, (capacity, now)), now, capacity, rate) for key in keys}
+            for key, tokens in levels.items():
+                if tokens < 1:
+                    return key, (1 - tokens) / rate
+            for key, tokens in levels.items():
+                self.buckets[key] = (tokens - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return None, 0
+
+
+class FileBackend:
+    """
+    Корзины токенов в локальном файле SQLite, общем для всех воркеров на машине.
+    Списание идёт в транзакции BEGIN IMMEDIATE, так что процессы не теряют обновления.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.calls = 0
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+            self.local.connection = connection
+        return connection
+
+    def consume(self, keys, capacity, rate, now):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            placeholders = ','.join('?' * len(keys))
+            stored = dict((key, (tokens, updated)) for key, tokens, updated in connection.execute(
+                f'SELECT key, tokens, updated FROM buckets WHERE key IN ({placeholders})', keys))
+            levels = {key: _refill(*stored.get(key, (capacity, now)), now, capacity, rate) for key in keys}
+            exhausted = next(((key, (1 - tokens) / rate) for key, tokens in levels.items() if tokens < 1), None)
+            if exhausted is None:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                    [(key, tokens - 1, now, now + (capacity - tokens + 1) / rate) for key, tokens in levels.items()]
+                )
+                self.calls += 1
+                if self.calls % self.PRUNE_EVERY == 0:
+                    connection.execute('DELETE FROM buckets WHERE full_at <= ?', (now,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return exhausted or (None, 0)
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов корзиной токенов по IP клиента и по логину.
+    Бэкенд: RATE_LIMIT_BACKEND = 'memory' (свой на процесс) или 'file'
+    (файл RATE_LIMIT_FILE, общий для воркеров gunicorn на одной машине).
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.limits = {}
+        self.enabled = True
+        self.rejected = Counter()
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.limits = {
+            'login': parse_limit(app.config['LOGIN_RATE_LIMIT']),
+            'register': parse_limit(app.config['REGISTER_RATE_LIMIT']),
+        }
+        if app.config['RATE_LIMIT_BACKEND'] == 'file':
+            self.backend = FileBackend(app.config['RATE_LIMIT_FILE'])
+        else:
+            self.backend = MemoryBackend(app.config['RATE_LIMIT_MAX_KEYS'])
+        self.rejected = Counter()
+
+    def hit(self, scope, ip, login=None):
+        """Учитывает попытку; при превышении лимита возвращает число секунд до следующей разрешённой."""
+        if not self.enabled:
+            return 0
+        capacity, period = self.limits[scope]
+        keys = [f'{scope}:ip:{ip}']
+        if login:
+            keys.append(f'{scope}:login:{login.strip().lower()}')
+        key, wait = self.backend.consume(keys, capacity, capacity / period, time.time())
+        if key is None:
+            return 0
+        with self.lock:
+            self.rejected[f'{scope}:{key.split(":")[1]}'] += 1
+        return max(1, math.ceil(wait))
+
+    def stats(self):
+        """Число отклонённых запросов по области и виду ключа: {'login:ip': 3, 'login:login': 1}."""
+        with self.lock:
+            return dict(self.rejected)
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited(scope, login_field='login'):
+    """
+    Декоратор для POST-запросов входа и регистрации: лимит проверяется до
+    валидации формы, запросов к БД и хэширования пароля.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method == 'POST':
+                retry_after = rate_limiter.hit(scope, request.remote_addr, request.form.get(login_field))
+                if retry_after:
+                    raise TooManyRequests(retry_after=retry_after)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
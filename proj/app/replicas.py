@@ -0,0 +1,126 @@
+# app/replicas.py
+
+import threading
+import time
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextClause, text
+from app.metrics import metrics
+
+REPLICA_BIND = 'replica'
+
+# Отставание реплики PostgreSQL в секундах; 0, если всё полученное уже применено
+# (иначе на простаивающем мастере отставание росло бы без новых транзакций)
+PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def is_read_only(clause):
+    """SELECT без FOR UPDATE/FOR SHARE - построенный или текстовый (FTS, статистика pg_class)."""
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        sql = ' '.join(clause.text.split()).upper()
+        return sql.startswith('SELECT ') and ' FOR UPDATE' not in sql and ' FOR SHARE' not in sql
+    return False
+
+
+def is_write(clause):
+    """INSERT/UPDATE/DELETE, блокирующий SELECT или текстовый запрос, не являющийся чистым чтением."""
+    if isinstance(clause, Select):
+        return clause._for_update_arg is not None
+    if isinstance(clause, TextClause):
+        return not is_read_only(clause)
+    return bool(getattr(clause, 'is_dml', False))
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет чтение на реплику, если её выбрал ReplicaRouter
+    для текущего запроса. Запись, flush и SELECT ... FOR UPDATE всегда идут на основную базу;
+    запрос, который что-то записал, отмечается в g.db_wrote. Прочие обращения
+    (session.connection() без выражения) идут на основную базу, не считаясь записью.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or is_write(clause):
+                g.db_wrote = True
+            elif is_read_only(clause) and g.get('db_route') == REPLICA_BIND:
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Выбирает для GET-запроса реплику или основную базу:
+    - реплика используется только для маршрутов из REPLICA_ROUTES;
+    - клиент, который только что писал, REPLICA_STICKY_SECONDS читает с основной базы
+      (например, редирект на view_animal после apply_for_adoption видит свою заявку);
+    - при отставании реплики больше REPLICA_MAX_LAG_SECONDS или её недоступности
+      чтение идёт с основной базы.
+    """
+
+    def __init__(self):
+        self.lag_probe = None
+        self.lag_checked_at = 0.0
+        self.lag = 0.0
+        self.lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self.lag_checked_at = 0.0
+        self.lag = 0.0
+        if not app.config['REPLICA_DATABASE_URI']:
+            return
+        self.lag_probe = lambda: self.probe_lag(db)
+        routes = frozenset(app.config['REPLICA_ROUTES'])
+
+        @app.before_request
+        def choose_database():
+            if request.method in ('GET', 'HEAD') and request.endpoint in routes:
+                if session.get('db_primary_until', 0) > time.time():
+                    metrics.inc('db.replica.sticky_primary')
+                elif self.replica_lag(app) > app.config['REPLICA_MAX_LAG_SECONDS']:
+                    metrics.inc('db.replica.lag_fallback')
+                else:
+                    g.db_route = REPLICA_BIND
+                    metrics.inc('db.replica.requests')
+
+        @app.after_request
+        def remember_write(response):
+            if g.get('db_wrote'):
+                session['db_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+            return response
+
+        @app.teardown_request
+        def forget_route(exc):
+            g.pop('db_route', None)
+            g.pop('db_wrote', None)
+
+    def probe_lag(self, db):
+        engine = db.engines[REPLICA_BIND]
+        if engine.dialect.name != 'postgresql':
+            return 0.0
+        with engine.connect() as connection:
+            return float(connection.execute(PG_LAG_SQL).scalar() or 0)
+
+    def replica_lag(self, app):
+        """Отставание реплики, измеряемое не чаще раза в REPLICA_LAG_CHECK_INTERVAL секунд; ошибка - бесконечность."""
+        now = time.monotonic()
+        if now - self.lag_checked_at < app.config['REPLICA_LAG_CHECK_INTERVAL']:
+            return self.lag
+        with self.lock:
+            if now - self.lag_checked_at >= app.config['REPLICA_LAG_CHECK_INTERVAL']:
+                try:
+                    self.lag = self.lag_probe()
+                except Exception:
+                    app.logger.exception('Не удалось проверить отставание реплики')
+                    self.lag = float('inf')
+                self.lag_checked_at = now
+                metrics.gauge('db.replica.lag', lambda: self.lag)
+        return self.lag
+
+
+replica_router = ReplicaRouter()
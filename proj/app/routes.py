@@ -1,39 +1,148 @@
 # app/routes.py
 
 import os
-import bleach
-from werkzeug.utils import secure_filename
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+import io
+import csv
+import mimetypes
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, current_app, abort,
+                   send_from_directory, make_response, Response, stream_with_context)
+from werkzeug.security import safe_join
+from werkzeug.exceptions import RequestEntityTooLarge, TooManyRequests
+from markupsafe import Markup
 from flask_login import login_user, logout_user, login_required, current_user
-from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import User, Animal, Photo, Adoption, Role
+from app.models import User, Animal, Adoption
 from app.forms import LoginForm, AnimalForm, AdoptionForm, RegistrationForm
-from app.decorators import roles_required
+from app.decorators import permission_required
+from app.permissions import Permission, has_permission, role_table
+from app.ratelimit import rate_limited
+from app.jobs import enqueue
+from app.adoptions import (moderate_adoptions, register_application, moderation_queue_page,
+                           moderation_queue_rows, ACTIONS)
+from app.queries import catalogue_query, catalogue_page, catalogue_select
+from app.facets import parse_filters, facet_counts
+from app.search import search_animal_ids, index_animal, remove_animal, SearchPage
+from app.images import image_pipeline
+from app.storage import (store_uploads, acquire_blob, release_photos, discard_uploads,
+                         photo_from_upload, immutable_etag, UploadTooLarge)
+from app.cache import catalogue_cache, viewer_class, invalidate_animal, animal_tag, CATALOGUE_TAG
 
 bp = Blueprint('routes', __name__)
 
-ALLOWED_TAGS = ['p', 'strong', 'em', 'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'br', 'blockquote']
-
 @bp.route('/')
 def index():
-    page = request.args.get('page', 1, type=int)
-    
-    status_order = case(
-        (Animal.status == 'available', 1),
-        (Animal.status == 'adoption', 2),
-        (Animal.status == 'adopted', 3),
-        else_=4
+    viewer = viewer_class()
+    filters = parse_filters(request.args)
+    filter_key = tuple(sorted(filters.items()))
+    if current_app.config['CATALOGUE_PAGINATION'] == 'offset':
+        page_key = ('page', viewer, filter_key, request.args.get('page', 1, type=int))
+    else:
+        page_key = ('page', viewer, filter_key, request.args.get('after'), request.args.get('before'))
+
+    catalogue = catalogue_cache.get(page_key)
+    if catalogue is None:
+        animals = load_catalogue_page(filters)
+        cards = {animal.id: render_animal_card(animal, viewer) for animal in animals.items}
+        catalogue = Markup(render_template('_catalogue.html', animals=animals, cards=cards, filters=filters))
+        tags = [CATALOGUE_TAG] + [animal_tag(animal_id) for animal_id in cards]
+        catalogue_cache.set(page_key, catalogue, tags=tags)
+
+    facets, total = facet_counts(filters)
+    return render_template('index.html', catalogue=catalogue, facets=facets, filters=filters,
+                           filtered_total=total, title='Главная')
+
+
+def load_catalogue_page(filters):
+    per_page = current_app.config['CATALOGUE_PER_PAGE']
+    if current_app.config['CATALOGUE_PAGINATION'] == 'offset':
+        page = request.args.get('page', 1, type=int)
+        return db.paginate(catalogue_query(filters), page=page, per_page=per_page, error_out=False)
+    return catalogue_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page,
+        with_total=current_app.config['CATALOGUE_APPROXIMATE_COUNT'],
+        filters=filters
     )
-    
-    animals_pagination = db.session.query(Animal).order_by(status_order, Animal.created_at.desc()).paginate(
-        page=page, per_page=9, error_out=False
+
+
+def render_animal_card(animal, viewer):
+    """Карточка животного из кэша фрагментов; кнопки в ней зависят от класса зрителя."""
+    return catalogue_cache.get_or_set(
+        ('card', animal.id, viewer),
+        lambda: Markup(render_template('_animal_card.html', animal=animal)),
+        tags=[animal_tag(animal.id)]
     )
-    return render_template('index.html', animals=animals_pagination, title='Главная')
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit_mb = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    flash(f'Слишком большой запрос: суммарный размер файлов не должен превышать {limit_mb} МБ.', 'danger')
+    return redirect(request.referrer or url_for('routes.index'))
+
+@bp.app_errorhandler(TooManyRequests)
+def too_many_requests(e):
+    flash('Слишком много попыток. Повторите через несколько минут.', 'danger')
+    response = make_response(render_template('rate_limited.html', title='Слишком много попыток'), 429)
+    response.headers.update(e.get_headers())
+    return response
+
+# --- ОТДАЧА ЗАГРУЖЕННЫХ ФОТОГРАФИЙ ---
+
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    config = current_app.config
+    if filename.startswith('tmp/'):
+        abort(404)
+
+    etag = immutable_etag(filename)
+    if etag is not None and request.if_none_match.contains(etag):
+        # Файл с хэшем в имени не меняется: отвечаем 304, не трогая диск
+        response = current_app.response_class(status=304)
+    elif config['UPLOAD_ACCEL_REDIRECT']:
+        # Отдачу байтов берёт на себя nginx (internal location с тем же каталогом)
+        path = safe_join(config['UPLOAD_FOLDER'], filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = config['UPLOAD_ACCEL_REDIRECT'].rstrip('/') + '/' + filename
+    else:
+        # При USE_X_SENDFILE = True Flask сам отдаёт файл через заголовок X-Sendfile
+        response = send_from_directory(config['UPLOAD_FOLDER'], filename, conditional=True, etag=etag or True)
+
+    response.cache_control.public = True
+    if etag is not None:
+        response.set_etag(etag)
+        response.cache_control.max_age = 365 * 24 * 3600
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = config['UPLOAD_CACHE_MAX_AGE']
+    return response
+
+@bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['CATALOGUE_PER_PAGE']
+
+    results, cards = None, {}
+    if query:
+        ids, total = search_animal_ids(query, page=page, per_page=per_page)
+        found = {}
+        if ids:
+            found = {animal.id: animal for animal in db.session.scalars(catalogue_select().where(Animal.id.in_(ids)))}
+        results = SearchPage([found[animal_id] for animal_id in ids if animal_id in found], page, per_page, total)
+        viewer = viewer_class()
+        cards = {animal.id: render_animal_card(animal, viewer) for animal in results.items}
+
+    return render_template('search.html', title='Поиск', query=query, results=results, cards=cards)
 
 # --- АУТЕНТИФИКАЦИЯ И РЕГИСТРАЦИЯ ---
 
 @bp.route('/login', methods=['GET', 'POST'])
+@rate_limited('login')
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('routes.index'))
@@ -43,6 +152,8 @@ def login():
         if user is None or not user.check_password(form.password.data):
             flash('Невозможно аутентифицироваться с указанными логином и паролем', 'danger')
             return redirect(url_for('routes.login'))
+        if user.rehash_password(form.password.data):
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or not next_page.startswith('/'):
@@ -51,6 +162,7 @@ def login():
     return render_template('auth/login.html', title='Вход', form=form)
 
 @bp.route('/register', methods=['GET', 'POST'])
+@rate_limited('register')
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('routes.index'))
@@ -58,8 +170,8 @@ def register():
     form = RegistrationForm()
     if form.validate_on_submit():
         try:
-            user_role = Role.query.filter_by(name='user').first()
-            if not user_role:
+            user_role_id = role_table().id_of('user')
+            if user_role_id is None:
                 flash('Роль "user" не найдена. Обратитесь к администратору.', 'danger')
                 return redirect(url_for('routes.register'))
 
@@ -68,7 +180,7 @@ def register():
                 first_name=form.first_name.data,
                 last_name=form.last_name.data,
                 middle_name=form.middle_name.data,
-                role_id=user_role.id
+                role_id=user_role_id
             )
             new_user.set_password(form.password.data)
             
@@ -99,7 +211,7 @@ def view_animal(animal_id):
         return redirect(url_for('routes.index'))
 
     user_application = None
-    if current_user.is_authenticated and current_user.role.name == 'user':
+    if has_permission(current_user, Permission.APPLY_FOR_ADOPTION):
         user_application = db.session.scalar(
             db.select(Adoption).where(Adoption.animal_id == animal.id, Adoption.user_id == current_user.id)
         )
@@ -107,8 +219,9 @@ def view_animal(animal_id):
     # --- ИЗМЕНЕНИЕ ЗДЕСЬ ---
     # Готовим отсортированный список заявок здесь, а не в шаблоне
     sorted_adoptions = []
-    if current_user.is_authenticated and (current_user.is_admin or current_user.is_moderator):
-        sorted_adoptions = animal.adoptions.order_by(Adoption.application_date.desc()).all()
+    if has_permission(current_user, Permission.MODERATE_ADOPTIONS):
+        sorted_adoptions = (animal.adoptions.options(joinedload(Adoption.user))
+                            .order_by(Adoption.application_date.desc()).all())
 
     adoption_form = AdoptionForm()
     
@@ -127,39 +240,56 @@ def view_animal(animal_id):
 
 @bp.route('/animal/add', methods=['GET', 'POST'])
 @login_required
-@roles_required(['admin'])
+@permission_required(Permission.ADD_ANIMAL)
 def add_animal():
     form = AnimalForm()
     if form.validate_on_submit():
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        # Завершаем читающую транзакцию (загрузка пользователя), чтобы соединение
+        # не держалось открытым, пока файлы пишутся на диск
+        db.session.commit()
+        try:
+            stored_files = store_uploads(
+                request.files.getlist(form.images.name), upload_folder,
+                max_file_size=current_app.config['UPLOAD_MAX_FILE_BYTES'],
+                max_workers=current_app.config['UPLOAD_WORKERS']
+            )
+        except UploadTooLarge as e:
+            flash(str(e), 'danger')
+            return render_template('animal_form.html', title='Добавить животное', form=form, is_edit=False)
+
         try:
-            cleaned_description = bleach.clean(form.description.data, tags=ALLOWED_TAGS, strip=True)
-            
             new_animal = Animal(
                 name=form.name.data,
-                description=cleaned_description,
                 age_in_months=form.age_in_months.data,
                 breed=form.breed.data,
                 gender=form.gender.data,
                 status=form.status.data
             )
+            new_animal.set_description(form.description.data)
             db.session.add(new_animal)
             db.session.flush()
-
-            files = request.files.getlist(form.images.name)
-            for file in files:
-                if file and file.filename != '':
-                    filename = secure_filename(file.filename)
-                    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
-                    
-                    new_photo = Photo(filename=filename, mimetype=file.mimetype, animal_id=new_animal.id)
-                    db.session.add(new_photo)
+            index_animal(new_animal)
+
+            new_photos, duplicates = [], []
+            for stored in stored_files:
+                acquired = acquire_blob(stored)
+                if acquired.filename != stored.filename:
+                    duplicates.append(stored)
+                new_photo = photo_from_upload(acquired, new_animal.id)
+                db.session.add(new_photo)
+                new_photos.append(new_photo)
             
             db.session.commit()
+            # Копии уже известного файла под другим расширением не нужны
+            discard_uploads(upload_folder, duplicates)
+            invalidate_animal(new_animal.id, reorder=True)
+            image_pipeline.submit([photo.id for photo in new_photos])
             flash('Животное успешно добавлено!', 'success')
             return redirect(url_for('routes.view_animal', animal_id=new_animal.id))
         except Exception as e:
             db.session.rollback()
+            discard_uploads(upload_folder, stored_files)
             flash(f'При сохранении данных возникла ошибка: {e}. Проверьте корректность введённых данных.', 'danger')
             
     return render_template('animal_form.html', title='Добавить животное', form=form, is_edit=False)
@@ -167,7 +297,7 @@ def add_animal():
 
 @bp.route('/animal/<int:animal_id>/edit', methods=['GET', 'POST'])
 @login_required
-@roles_required(['admin', 'moderator'])
+@permission_required(Permission.EDIT_ANIMAL)
 def edit_animal(animal_id):
     animal = db.session.get(Animal, animal_id)
     if not animal:
@@ -179,13 +309,18 @@ def edit_animal(animal_id):
 
     if form.validate_on_submit():
         try:
+            old_facets = (animal.status, animal.gender, animal.breed, animal.age_in_months)
             animal.name = form.name.data
-            animal.description = bleach.clean(form.description.data, tags=ALLOWED_TAGS, strip=True)
+            animal.set_description(form.description.data)
             animal.age_in_months = form.age_in_months.data
             animal.breed = form.breed.data
             animal.gender = form.gender.data
             animal.status = form.status.data
+            index_animal(animal)
             db.session.commit()
+            # Смена статуса меняет порядок, а смена любого фильтруемого поля - состав отфильтрованных страниц
+            new_facets = (animal.status, animal.gender, animal.breed, animal.age_in_months)
+            invalidate_animal(animal.id, reorder=new_facets != old_facets)
             flash('Данные о животном успешно обновлены!', 'success')
             return redirect(url_for('routes.view_animal', animal_id=animal.id))
         except Exception as e:
@@ -196,19 +331,22 @@ def edit_animal(animal_id):
 
 @bp.route('/animal/<int:animal_id>/delete', methods=['POST'])
 @login_required
-@roles_required(['admin'])
+@permission_required(Permission.DELETE_ANIMAL)
 def delete_animal(animal_id):
     animal = db.session.get(Animal, animal_id)
     if animal:
         try:
             animal_name = animal.name
-            for photo in animal.photos:
-                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], photo.filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+            orphaned = release_photos(animal.photos)
             
+            animal_id = animal.id
+            remove_animal(animal_id)
             db.session.delete(animal)
+            # Файлы удалит воркер: задача ставится в этой же транзакции и при rollback исчезает
+            if orphaned:
+                enqueue('remove_files', {'files': orphaned})
             db.session.commit()
+            invalidate_animal(animal_id, reorder=True)
             flash(f'Животное "{animal_name}" и все связанные данные удалены.', 'success')
         except Exception as e:
             db.session.rollback()
@@ -221,7 +359,7 @@ def delete_animal(animal_id):
 
 @bp.route('/animal/<int:animal_id>/apply', methods=['POST'])
 @login_required
-@roles_required(['user'])
+@permission_required(Permission.APPLY_FOR_ADOPTION)
 def apply_for_adoption(animal_id):
     animal = db.session.get(Animal, animal_id)
     if not animal or animal.status == 'adopted':
@@ -243,11 +381,15 @@ def apply_for_adoption(animal_id):
                 user_id=current_user.id,
                 contact_info=form.contact_info.data
             )
-            if animal.status == 'available':
-                 animal.status = 'adoption'
-            
+            status_changed = animal.status == 'available'
+            if not register_application(animal.id):
+                db.session.rollback()
+                flash('Это животное уже нашло дом.', 'warning')
+                return redirect(url_for('routes.view_animal', animal_id=animal_id))
+
             db.session.add(application)
             db.session.commit()
+            invalidate_animal(animal.id, reorder=status_changed)
             flash('Ваша заявка на усыновление успешно отправлена!', 'success')
         except Exception as e:
             db.session.rollback()
@@ -261,41 +403,103 @@ def apply_for_adoption(animal_id):
 
 @bp.route('/adoption/<int:adoption_id>/<action>', methods=['POST'])
 @login_required
-@roles_required(['admin', 'moderator'])
+@permission_required(Permission.MODERATE_ADOPTIONS)
 def handle_adoption(adoption_id, action):
-    application = db.session.get(Adoption, adoption_id)
-    if not application:
+    animal_id = db.session.scalar(db.select(Adoption.animal_id).where(Adoption.id == adoption_id))
+    if animal_id is None or action not in ACTIONS:
         flash('Заявка не найдена.', 'danger')
         return redirect(request.referrer or url_for('routes.index'))
 
-    animal = application.animal
     try:
-        if action == 'accept':
-            application.status = 'accepted'
-            animal.status = 'adopted'
-            
-            db.session.query(Adoption).filter(
-                Adoption.animal_id == animal.id,
-                Adoption.status == 'pending'
-            ).update({'status': 'rejected_adopted'})
-            
+        result = moderate_adoptions({adoption_id: action})
+        db.session.commit()
+        invalidate_moderated(result)
+        if result.accepted:
             flash('Заявка одобрена. Животное обрело дом!', 'success')
+        elif result.rejected:
+            flash('Заявка отклонена.', 'info')
+        else:
+            flash('Заявка уже рассмотрена.', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Произошла ошибка при обработке заявки: {e}', 'danger')
 
-        elif action == 'reject':
-            application.status = 'rejected'
-            
-            pending_count = db.session.scalar(db.select(func.count(Adoption.id)).where(
-                Adoption.animal_id == animal.id,
-                Adoption.status == 'pending'
-            ))
-            if pending_count == 0 and animal.status != 'adopted':
-                animal.status = 'available'
+    return redirect(url_for('routes.view_animal', animal_id=animal_id))
 
-            flash('Заявка отклонена.', 'info')
-        
+@bp.route('/adoptions/moderate', methods=['POST'])
+@login_required
+@permission_required(Permission.MODERATE_ADOPTIONS)
+def moderate_adoptions_batch():
+    accept = set(request.form.getlist('accept', type=int))
+    reject = set(request.form.getlist('reject', type=int))
+    # Заявка, отмеченная и к принятию, и к отклонению, не трогается
+    decisions = {adoption_id: 'accept' for adoption_id in accept - reject}
+    decisions.update({adoption_id: 'reject' for adoption_id in reject - accept})
+    if not decisions:
+        flash('Не выбрано ни одной заявки.', 'warning')
+        return redirect(request.referrer or url_for('routes.index'))
+
+    try:
+        result = moderate_adoptions(decisions)
         db.session.commit()
+        invalidate_moderated(result)
+        flash(f'Принято заявок: {len(result.accepted)}, отклонено: {len(result.rejected)}.', 'success')
+        if result.superseded:
+            flash(f'Отклонено заявок на животных, пристроенных по более ранней заявке: {len(result.superseded)}.', 'info')
+        if result.skipped:
+            flash(f'Пропущено заявок, уже рассмотренных или не найденных: {len(result.skipped)}.', 'warning')
     except Exception as e:
         db.session.rollback()
-        flash(f'Произошла ошибка при обработке заявки: {e}', 'danger')
+        flash(f'Произошла ошибка при обработке заявок: {e}', 'danger')
 
-    return redirect(url_for('routes.view_animal', animal_id=animal.id))
\ No newline at end of file
+    return redirect(request.referrer or url_for('routes.index'))
+
+
+@bp.route('/adoptions/queue')
+@login_required
+@permission_required(Permission.MODERATE_ADOPTIONS)
+def moderation_queue():
+    applications = moderation_queue_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=current_app.config['ADOPTION_QUEUE_PER_PAGE'],
+    )
+    return render_template('moderation_queue.html', title='Заявки на рассмотрении', applications=applications)
+
+# Ячейки, которые Excel и LibreOffice выполняют как формулы
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_safe(value):
+    """Экранирует апострофом пользовательский текст, который табличный редактор принял бы за формулу."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+@bp.route('/adoptions/queue.csv')
+@login_required
+@permission_required(Permission.MODERATE_ADOPTIONS)
+def moderation_queue_csv():
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['id', 'application_date', 'animal_id', 'animal', 'login', 'last_name', 'first_name', 'contact_info'])
+        for row in moderation_queue_rows():
+            writer.writerow([row.id, row.application_date.isoformat(sep=' ', timespec='seconds'), row.animal_id,
+                             *map(csv_safe, (row.name, row.login, row.last_name, row.first_name, row.contact_info))])
+            # Отдаём накопленное, не дожидаясь конца выборки
+            if buffer.tell() > 16384:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=adoption_queue.csv'
+    return response
+
+
+def invalidate_moderated(result):
+    for animal_id, (old_status, new_status) in result.animals.items():
+        invalidate_animal(animal_id, reorder=old_status != new_status)
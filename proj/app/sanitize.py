@@ -0,0 +1,40 @@
+# app/sanitize.py
+
+import threading
+import bleach
+import markdown
+
+ALLOWED_TAGS = ['p', 'strong', 'em', 'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'br', 'blockquote']
+
+# bleach.Cleaner и markdown.Markdown хранят состояние парсера и не потокобезопасны,
+# поэтому держим по одному экземпляру на поток и переиспользуем их между вызовами
+_local = threading.local()
+
+
+def _cleaner():
+    cleaner = getattr(_local, 'cleaner', None)
+    if cleaner is None:
+        cleaner = _local.cleaner = bleach.Cleaner(tags=ALLOWED_TAGS, strip=True)
+    return cleaner
+
+
+def _markdown():
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        md = _local.markdown = markdown.Markdown()
+    return md
+
+
+def clean_markdown(text):
+    """Очищает исходный Markdown-текст от недопустимых HTML-тегов."""
+    return _cleaner().clean(text or '')
+
+
+def render_markdown(text):
+    """Рендерит Markdown в HTML и санитизирует результат. Вызывается один раз при сохранении."""
+    md = _markdown()
+    try:
+        html = md.convert(text or '')
+    finally:
+        md.reset()
+    return _cleaner().clean(html)
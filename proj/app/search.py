@@ -0,0 +1,138 @@
+# app/search.py
+
+import re
+from sqlalchemy import DDL, event, text
+from app import db
+from app.models import Animal
+
+# Конфигурация полнотекстового поиска PostgreSQL (словарь и стемминг)
+PG_TS_CONFIG = 'russian'
+
+# Документ животного: имя важнее породы, порода важнее описания
+PG_DOCUMENT_SQL = (
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(breed, '')), 'B') || "
+    f"setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+# PostgreSQL: колонка animals.search_vector с GIN-индексом
+event.listen(Animal.__table__, 'after_create', DDL(
+    'ALTER TABLE animals ADD COLUMN search_vector tsvector; '
+    'CREATE INDEX ix_animals_search_vector ON animals USING GIN (search_vector)'
+).execute_if(dialect='postgresql'))
+
+# SQLite (локальный запуск и тесты): отдельная таблица FTS5, rowid = animals.id
+event.listen(Animal.__table__, 'after_create', DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS animals_fts USING fts5("
+    "name, breed, description, tokenize = 'unicode61 remove_diacritics 2')"
+).execute_if(dialect='sqlite'))
+event.listen(Animal.__table__, 'before_drop', DDL(
+    'DROP TABLE IF EXISTS animals_fts'
+).execute_if(dialect='sqlite'))
+
+
+class SearchPage:
+    """Страница результатов поиска в порядке релевантности."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+
+def _is_postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _fts5_query(query):
+    """Безопасный запрос FTS5: каждое слово в кавычках и с поиском по префиксу."""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', query))
+
+
+def index_animal(animal):
+    """Обновляет поисковый индекс для животного. Вызывается в той же транзакции, что и изменение."""
+    # text() не вызывает autoflush: без flush документ PostgreSQL собрался бы из старых значений строки
+    db.session.flush()
+    if _is_postgresql():
+        db.session.execute(text(f'UPDATE animals SET search_vector = {PG_DOCUMENT_SQL} WHERE id = :id'),
+                           {'id': animal.id})
+    else:
+        db.session.execute(text('DELETE FROM animals_fts WHERE rowid = :id'), {'id': animal.id})
+        db.session.execute(
+            text('INSERT INTO animals_fts (rowid, name, breed, description) VALUES (:id, :name, :breed, :description)'),
+            {'id': animal.id, 'name': animal.name, 'breed': animal.breed, 'description': animal.description}
+        )
+
+
+def remove_animal(animal_id):
+    """Убирает животное из индекса (на PostgreSQL вектор удаляется вместе со строкой)."""
+    if not _is_postgresql():
+        db.session.execute(text('DELETE FROM animals_fts WHERE rowid = :id'), {'id': animal_id})
+
+
+def rebuild_index():
+    """Полностью перестраивает поисковый индекс. Возвращает число проиндексированных животных."""
+    if _is_postgresql():
+        db.session.execute(text(f'UPDATE animals SET search_vector = {PG_DOCUMENT_SQL}'))
+    else:
+        db.session.execute(text('DELETE FROM animals_fts'))
+        db.session.execute(text(
+            'INSERT INTO animals_fts (rowid, name, breed, description) '
+            'SELECT id, name, breed, description FROM animals'
+        ))
+    db.session.commit()
+    return db.session.scalar(db.select(db.func.count(Animal.id)))
+
+
+def search_animal_ids(query, page=1, per_page=9):
+    """
+    Ищет животных по имени, породе и описанию.
+
+    :return: (id животных текущей страницы по убыванию релевантности, общее число найденных)
+    """
+    offset = (page - 1) * per_page
+    if _is_postgresql():
+        params = {'query': query, 'limit': per_page, 'offset': offset}
+        match = f"search_vector @@ websearch_to_tsquery('{PG_TS_CONFIG}', :query)"
+        ids = db.session.scalars(text(
+            f"SELECT id FROM animals WHERE {match} "
+            f"ORDER BY ts_rank_cd(search_vector, websearch_to_tsquery('{PG_TS_CONFIG}', :query)) DESC, id "
+            f"LIMIT :limit OFFSET :offset"
+        ), params).all()
+        count_sql = f'SELECT count(*) FROM animals WHERE {match}'
+    else:
+        fts_query = _fts5_query(query)
+        if not fts_query:
+            return [], 0
+        params = {'query': fts_query, 'limit': per_page, 'offset': offset}
+        ids = db.session.scalars(text(
+            'SELECT rowid FROM animals_fts WHERE animals_fts MATCH :query '
+            'ORDER BY bm25(animals_fts, 10.0, 5.0, 1.0), rowid LIMIT :limit OFFSET :offset'
+        ), params).all()
+        count_sql = 'SELECT count(*) FROM animals_fts WHERE animals_fts MATCH :query'
+
+    # На неполной первой странице общее число известно без отдельного COUNT
+    if page == 1 and len(ids) < per_page:
+        return ids, len(ids)
+    return ids, db.session.scalar(text(count_sql), params)
@@ -0,0 +1,208 @@
+# app/seed.py
+
+import csv
+import io
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.models import Role
+from app.passwords import password_hasher
+from app.sanitize import render_markdown
+from app.search import rebuild_index
+
+# Распределения синтетических данных: породы и клички с весами (чаще всего - дворняги),
+# возраст по логнормальному закону (молодых больше), фото и заявки - с длинным хвостом
+BREEDS = (
+    ('Дворняга', 40), ('Метис', 15), ('Лабрадор', 6), ('Овчарка', 6), ('Такса', 4), ('Хаски', 4),
+    ('Британская', 5), ('Сиамская', 3), ('Мейн-кун', 3), ('Сфинкс', 2), ('Йоркширский терьер', 3),
+    ('Шпиц', 3), ('Бигль', 2), ('Корги', 2), ('Персидская', 2),
+)
+ANIMAL_NAMES = ('Барсик', 'Мурка', 'Шарик', 'Бобик', 'Рыжик', 'Пушок', 'Дымка', 'Граф', 'Лаки', 'Найда',
+                'Джек', 'Белка', 'Тузик', 'Снежок', 'Марта', 'Жужа', 'Тимоша', 'Соня', 'Рекс', 'Ася')
+FIRST_NAMES = ('Иван', 'Анна', 'Пётр', 'Мария', 'Алексей', 'Ольга', 'Дмитрий', 'Елена', 'Сергей', 'Наталья')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков')
+DESCRIPTIONS = tuple(
+    f'**{trait}** и {habit}. {extra}'
+    for trait in ('Ласковый', 'Игривый', 'Спокойный', 'Любопытный', 'Застенчивый')
+    for habit in ('любит гулять', 'ладит с детьми', 'приучен к лотку', 'привит по возрасту')
+    for extra in ('Ищет заботливую семью.', 'Подойдёт для квартиры.')
+)
+SEED_PASSWORD = 'password123'
+START_DATE = datetime(2025, 1, 1)
+
+
+class BulkWriter:
+    """
+    Вставка строк пачками: COPY на PostgreSQL, executemany через DBAPI на SQLite
+    и других базах. Строки - кортежи в порядке columns.
+    """
+
+    def __init__(self, connection, batch_size):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.postgresql = connection.dialect.name == 'postgresql'
+
+    def _value(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ') if self.postgresql else value.strftime('%Y-%m-%d %H:%M:%S.%f')
+        return value
+
+    def write(self, table, columns, rows):
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(tuple(self._value(value) for value in row))
+            if len(batch) >= self.batch_size:
+                self._flush(table, columns, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._flush(table, columns, batch)
+            count += len(batch)
+        return count
+
+    def _flush(self, table, columns, batch):
+        cursor = self.connection.connection.cursor()
+        try:
+            if self.postgresql:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(['\\N' if value is None else value for value in row] for row in batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            else:
+                placeholders = ', '.join('?' * len(columns))
+                cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", batch)
+        finally:
+            cursor.close()
+
+
+def _next_id(table):
+    return (db.session.scalar(text(f'SELECT MAX(id) FROM {table}')) or 0) + 1
+
+
+def _reset_sequences(tables):
+    """После COPY с явными id сдвигаем последовательности PostgreSQL."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"))
+
+
+def seed_database(users, animals, photos_per_animal, adoptions, seed=0, batch_size=10000, log=print):
+    """
+    Добавляет синтетических пользователей, животных, фото и заявки. Один и тот же seed
+    на пустой базе даёт те же данные. Все пользователи получают пароль SEED_PASSWORD
+    (хэш вычисляется один раз). Счётчики и статусы животных согласованы с заявками.
+    Фото ссылаются на несуществующие файлы: для нагрузки на БД и шаблоны это не важно.
+    """
+    rng = random.Random(seed)
+    roles = dict(db.session.execute(db.select(Role.name, Role.id)).all())
+    if not {'user', 'moderator'} <= roles.keys():
+        raise LookupError('Роли не найдены: сначала выполните flask init-db')
+    password_hash = password_hasher.hash(SEED_PASSWORD)
+    descriptions = [(text_, render_markdown(text_)) for text_ in DESCRIPTIONS]
+    breeds, breed_weights = zip(*BREEDS)
+    first_user, first_animal = _next_id('users'), _next_id('animals')
+    first_photo, first_adoption = _next_id('photos'), _next_id('adoptions')
+
+    connection = db.session.connection()
+    writer = BulkWriter(connection, batch_size)
+    totals = {}
+    started = time.perf_counter()
+
+    def user_rows():
+        for n in range(users):
+            user_id = first_user + n
+            # Примерно один модератор на двести пользователей
+            role = roles['moderator'] if rng.random() < 0.005 else roles['user']
+            yield (user_id, f'seed_user_{user_id}', password_hash, rng.choice(LAST_NAMES),
+                   rng.choice(FIRST_NAMES), None, role)
+
+    totals['users'] = writer.write(
+        'users', ('id', 'login', 'password_hash', 'last_name', 'first_name', 'middle_name', 'role_id'), user_rows())
+    log(f"Пользователей: {totals['users']} ({time.perf_counter() - started:.1f} с)")
+
+    # Заявки распределены по животным неравномерно (закон Ципфа): у немногих их много
+    popularity = [1 / (rank + 1) ** 0.8 for rank in range(animals)]
+    rng.shuffle(popularity)
+    per_animal = [0] * animals
+    if animals and users:
+        for index in rng.choices(range(animals), weights=popularity, k=adoptions):
+            per_animal[index] += 1
+        per_animal = [min(count, users) for count in per_animal]
+
+    created = [START_DATE + timedelta(minutes=rng.randrange(365 * 24 * 60)) for _ in range(animals)]
+    # Исход по каждому животному: пристроено (одна принятая заявка), ждёт решения или свободно
+    outcomes = []
+    for count in per_animal:
+        if count == 0:
+            outcomes.append(('available', 0))
+        elif rng.random() < 0.3:
+            outcomes.append(('adopted', 0))
+        else:
+            pending = sum(1 for _ in range(count) if rng.random() < 0.8)
+            outcomes.append(('adoption', pending) if pending else ('available', 0))
+
+    def animal_rows():
+        for n in range(animals):
+            description, description_html = rng.choice(descriptions)
+            age = max(1, min(240, int(rng.lognormvariate(math.log(18), 0.9))))
+            status, pending = outcomes[n]
+            yield (first_animal + n, f'{rng.choice(ANIMAL_NAMES)} {first_animal + n}', description, description_html,
+                   age, rng.choices(breeds, weights=breed_weights)[0], rng.choice(('male', 'female')),
+                   status, created[n], per_animal[n], pending)
+
+    totals['animals'] = writer.write(
+        'animals', ('id', 'name', 'description', 'description_html', 'age_in_months', 'breed', 'gender', 'status',
+                    'created_at', 'adoption_count', 'pending_count'), animal_rows())
+    log(f"Животных: {totals['animals']} ({time.perf_counter() - started:.1f} с)")
+
+    def photo_rows():
+        photo_id = first_photo
+        for n in range(animals):
+            # Геометрическое распределение со средним photos_per_animal, не больше 10 фото
+            count = 0
+            while count < 10 and rng.random() < photos_per_animal / (photos_per_animal + 1):
+                count += 1
+            for k in range(count):
+                yield (photo_id, f'seed/{first_animal + n}_{k}.jpg', 'image/jpeg', first_animal + n)
+                photo_id += 1
+
+    totals['photos'] = writer.write('photos', ('id', 'filename', 'mimetype', 'animal_id'), photo_rows())
+    log(f"Фотографий: {totals['photos']} ({time.perf_counter() - started:.1f} с)")
+
+    def adoption_rows():
+        adoption_id = first_adoption
+        for n in range(animals):
+            count = per_animal[n]
+            if not count:
+                continue
+            status, pending = outcomes[n]
+            applicants = rng.sample(range(first_user, first_user + users), count)
+            if status == 'adopted':
+                statuses = ['accepted'] + ['rejected_adopted'] * (count - 1)
+            else:
+                statuses = ['pending'] * pending + ['rejected'] * (count - pending)
+            rng.shuffle(statuses)
+            for user_id, adoption_status in zip(applicants, statuses):
+                applied = created[n] + timedelta(minutes=rng.randrange(1, 60 * 24 * 60))
+                yield (adoption_id, first_animal + n, user_id, applied, adoption_status, '+7 900 000-00-00')
+                adoption_id += 1
+
+    totals['adoptions'] = writer.write(
+        'adoptions', ('id', 'animal_id', 'user_id', 'application_date', 'status', 'contact_info'), adoption_rows())
+    log(f"Заявок: {totals['adoptions']} ({time.perf_counter() - started:.1f} с)")
+
+    _reset_sequences(('users', 'animals', 'photos', 'adoptions'))
+    db.session.commit()
+    rebuild_index()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    log(f'Поисковый индекс перестроен ({time.perf_counter() - started:.1f} с)')
+    return totals
@@ -0,0 +1,122 @@
+# app/sqltrace.py
+
+import json
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.metrics import metrics
+
+# Активные записи запросов текущего потока/контекста; записи могут быть вложены
+# (например, бюджет запросов в тесте вокруг запроса тестового клиента)
+_recorders = ContextVar('sql_recorders', default=())
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)')
+_POSTCOMPILE = re.compile(r'\(__\[POSTCOMPILE_\w+\]\)')
+_SPACES = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Текст выражения без различий в длине списков IN (...) и пробелах - по нему ищутся повторы."""
+    shape = _IN_LIST.sub('(?)', statement)
+    shape = _POSTCOMPILE.sub('(?)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class QueryRecording:
+    """
+    Число SQL-выражений, суммарное время в БД и повторы одинаковых по форме выражений.
+    С keep_statements=True сохраняется и текст каждого выражения (для тестов).
+    """
+
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.statements = [] if keep_statements else None
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def repeated(self, threshold):
+        """Формы выражений, выполненные не меньше threshold раз: признак N+1."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+@contextmanager
+def record_queries(keep_statements=False):
+    recording = QueryRecording(keep_statements)
+    token = _recorders.set(_recorders.get() + (recording,))
+    try:
+        yield recording
+    finally:
+        _recorders.reset(token)
+
+
+# Время начала хранится в контексте выполнения самого выражения: если выражение упало
+# и after_cursor_execute не вызван, на соединении из пула ничего не остаётся
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recorders.get() and context is not None:
+        context._sqltrace_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorders = _recorders.get()
+    started = getattr(context, '_sqltrace_started', None)
+    if not recorders or started is None:
+        return
+    duration = time.perf_counter() - started
+    for recording in recorders:
+        recording.add(statement, duration)
+
+
+def init_sqltrace(app):
+    """
+    Запись SQL на каждый запрос: заголовок Server-Timing, структурированная строка
+    лога и предупреждение, если одно и то же выражение выполнено SQL_REPEAT_THRESHOLD раз.
+    """
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    @app.before_request
+    def start_recording():
+        g.sql_recording = QueryRecording()
+        g.sql_recording_token = _recorders.set(_recorders.get() + (g.sql_recording,))
+
+    @app.after_request
+    def report_recording(response):
+        recording = g.get('sql_recording')
+        if recording is None:
+            return response
+        db_ms = recording.duration * 1000
+        if app.config['SQL_SERVER_TIMING']:
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{recording.count} queries"')
+        repeated = recording.repeated(app.config['SQL_REPEAT_THRESHOLD'])
+        line = json.dumps({
+            'event': 'sql', 'method': request.method, 'endpoint': request.endpoint, 'status': response.status_code,
+            'queries': recording.count, 'db_ms': round(db_ms, 2),
+            'repeated': [{'statement': shape[:200], 'count': count} for shape, count in repeated],
+        }, ensure_ascii=False)
+        if repeated:
+            app.logger.warning(line)
+        else:
+            app.logger.info(line)
+        metrics.observe('db.request_time', recording.duration)
+        metrics.inc('db.request_queries', recording.count)
+        return response
+
+    @app.teardown_request
+    def stop_recording(exc):
+        token = g.pop('sql_recording_token', None)
+        if token is not None:
+            _recorders.reset(token)
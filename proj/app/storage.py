@@ -0,0 +1,210 @@
+# app/storage.py
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import Photo, PhotoBlob
+from app.images import remove_variants
+
+CHUNK_SIZE = 64 * 1024
+
+# Имена, производные от хэша содержимого: сам файл и его уменьшенные копии.
+# Содержимое по такому имени никогда не меняется, поэтому его можно кэшировать навсегда.
+CONTENT_HASHED_NAME = re.compile(
+    r'^(?:variants/)?[0-9a-f]{2}/[0-9a-f]{2}/(?P<hash>[0-9a-f]{64})(?P<suffix>_\d+w)?\.[A-Za-z0-9]+$'
+)
+
+# created - файл появился на диске при этой загрузке (а не совпал с уже существующим)
+StoredUpload = namedtuple('StoredUpload', ['filename', 'content_hash', 'size', 'mimetype', 'created'])
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def blob_filename(content_hash, extension):
+    """Путь файла относительно UPLOAD_FOLDER: два уровня шардирования по префиксу хэша."""
+    return f'{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}'
+
+
+def immutable_etag(filename):
+    """Сильный ETag для файла с хэшем в имени (без чтения файла) или None для прочих имён."""
+    match = CONTENT_HASHED_NAME.match(filename)
+    if match is None:
+        return None
+    return match.group('hash') + (match.group('suffix') or '') + os.path.splitext(filename)[1].lower()
+
+
+def upload_extension(file):
+    extension = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    return extension or mimetypes.guess_extension(file.mimetype or '') or ''
+
+
+def store_upload(file, upload_folder, max_file_size=None):
+    """
+    Сохраняет загруженный файл под именем, производным от SHA-256 содержимого.
+    Файл копируется во временный блоками, хэш считается по ходу записи, затем
+    временный файл атомарно переносится на место. Если такой файл уже есть,
+    копия не создаётся.
+
+    :raises UploadTooLarge: файл больше max_file_size байт.
+    """
+    tmp_dir = os.path.join(upload_folder, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                size += len(chunk)
+                if max_file_size is not None and size > max_file_size:
+                    raise UploadTooLarge(
+                        f'Файл "{file.filename}" больше допустимых {max_file_size // (1024 * 1024)} МБ.')
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+
+    content_hash = digest.hexdigest()
+    filename = blob_filename(content_hash, upload_extension(file))
+    path = os.path.join(upload_folder, filename)
+    created = not os.path.exists(path)
+    if created:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp.name, path)
+    else:
+        os.remove(tmp.name)
+    return StoredUpload(filename, content_hash, size, file.mimetype, created)
+
+
+def store_uploads(files, upload_folder, max_file_size=None, max_workers=4):
+    """
+    Параллельно сохраняет несколько загруженных файлов (до обращения к БД).
+    Если хотя бы один файл не удалось сохранить, уже записанные новые файлы удаляются.
+    """
+    files = [file for file in files if file and file.filename]
+    if not files:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as pool:
+        futures = [pool.submit(store_upload, file, upload_folder, max_file_size) for file in files]
+
+    stored, error = [], None
+    for future in futures:
+        try:
+            stored.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        discard_uploads(upload_folder, stored)
+        raise error
+    return stored
+
+
+def referenced_filenames(filenames):
+    """Имена из списка, на которые ссылается запись PhotoBlob (файл нужен живой фотографии)."""
+    filenames = list(filenames)
+    if not filenames:
+        return set()
+    return set(db.session.scalars(db.select(PhotoBlob.filename).where(PhotoBlob.filename.in_(filenames))))
+
+
+def discard_uploads(upload_folder, stored_files):
+    """
+    Удаляет файлы, созданные неудачной загрузкой (например, после отката транзакции).
+    Файл, на который уже ссылается запись PhotoBlob, остаётся: те же байты могла
+    одновременно загрузить другая, успешная транзакция.
+    """
+    created = [stored for stored in stored_files if stored.created]
+    referenced = referenced_filenames(stored.filename for stored in created)
+    for stored in created:
+        path = os.path.join(upload_folder, stored.filename)
+        if stored.filename not in referenced and os.path.exists(path):
+            os.remove(path)
+
+
+def acquire_blob(stored):
+    """
+    Увеличивает счётчик ссылок на файл (создаёт запись при первой ссылке). Вызывается в транзакции.
+    На PostgreSQL и SQLite это один INSERT ... ON CONFLICT DO UPDATE, поэтому две одновременные
+    загрузки одинаковых байтов не создают запись дважды.
+
+    :return: stored с именем файла из записи PhotoBlob: те же байты могли быть загружены
+             раньше под другим расширением, и Photo должна ссылаться на уже учтённый файл.
+    """
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = pg_insert if dialect == 'postgresql' else sqlite_insert
+        stmt = insert(PhotoBlob).values(content_hash=stored.content_hash, filename=stored.filename,
+                                        size=stored.size, ref_count=1)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['content_hash'], set_={'ref_count': PhotoBlob.ref_count + 1}))
+    elif not db.session.execute(
+            db.update(PhotoBlob)
+            .where(PhotoBlob.content_hash == stored.content_hash)
+            .values(ref_count=PhotoBlob.ref_count + 1)
+    ).rowcount:
+        db.session.add(PhotoBlob(content_hash=stored.content_hash, filename=stored.filename,
+                                 size=stored.size, ref_count=1))
+        return stored
+    filename = db.session.scalar(db.select(PhotoBlob.filename).where(PhotoBlob.content_hash == stored.content_hash))
+    return stored._replace(filename=filename)
+
+
+def release_photos(photos):
+    """
+    Уменьшает счётчики ссылок для удаляемых фотографий. Вызывается в транзакции.
+
+    :return: список (имя файла, варианты) для файлов, на которые больше никто не ссылается;
+             удалять их с диска нужно только после успешного commit.
+    """
+    orphaned = []
+    for photo in photos:
+        if photo.content_hash is None:
+            orphaned.append((photo.filename, photo.variants))
+            continue
+        db.session.execute(
+            db.update(PhotoBlob)
+            .where(PhotoBlob.content_hash == photo.content_hash)
+            .values(ref_count=PhotoBlob.ref_count - 1)
+        )
+        blob = db.session.get(PhotoBlob, photo.content_hash, populate_existing=True)
+        if blob is not None and blob.ref_count <= 0:
+            orphaned.append((blob.filename, photo.variants))
+            db.session.delete(blob)
+    return orphaned
+
+
+def remove_files(upload_folder, orphaned):
+    for filename, variants in orphaned:
+        path = os.path.join(upload_folder, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        remove_variants(upload_folder, variants)
+
+
+def remove_orphaned_files(upload_folder, orphaned):
+    """
+    Удаляет файлы из списка release_photos, пропуская те, на которые к моменту
+    удаления снова сослались (тот же файл загрузили заново, пока задача ждала в очереди).
+    """
+    reacquired = referenced_filenames(filename for filename, _ in orphaned)
+    remove_files(upload_folder, [(filename, variants) for filename, variants in orphaned
+                                 if filename not in reacquired])
+
+
+def photo_from_upload(stored, animal_id):
+    """Photo для результата acquire_blob; связь с блобом задаёт порядок INSERT при flush."""
+    return Photo(filename=stored.filename, mimetype=stored.mimetype, content_hash=stored.content_hash,
+                 blob=db.session.get(PhotoBlob, stored.content_hash), animal_id=animal_id)
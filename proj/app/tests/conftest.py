@@ -0,0 +1,110 @@
+import io
+import pytest
+from contextlib import contextmanager
+from app import create_app, db
+from app.sqltrace import record_queries
+from app.models import Role, User, Animal, Photo, Adoption
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test'
+    IMAGE_WORKERS = 0
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+
+
+@pytest.fixture
+def app(tmp_path):
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+
+    app = create_app(_Config)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Role(name='admin', description='Администратор'),
+            Role(name='moderator', description='Модератор'),
+            Role(name='user', description='Пользователь'),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(login, role_name='user', password='password123'):
+    role = db.session.scalar(db.select(Role).where(Role.name == role_name))
+    user = User(login=login, first_name='Тест', last_name='Тестов', role_id=role.id)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_animal(name='Барсик', status='available', photos=0, adoptions=0, **kwargs):
+    values = dict(name=name, description='Описание', age_in_months=12, breed='Дворняга',
+                  gender='male', status=status, adoption_count=adoptions, pending_count=adoptions)
+    values.update(kwargs)
+    animal = Animal(**values)
+    db.session.add(animal)
+    db.session.flush()
+    for i in range(photos):
+        db.session.add(Photo(filename=f'{name}-{i}.jpg', mimetype='image/jpeg', animal_id=animal.id))
+    for i in range(adoptions):
+        user = make_user(f'{name}-applicant-{i}')
+        db.session.add(Adoption(animal_id=animal.id, user_id=user.id, contact_info='+7 900 000-00-00'))
+    db.session.commit()
+    return animal
+
+
+def run_jobs(app):
+    """Выполняет все готовые фоновые задачи, как `flask worker --until-empty`."""
+    from app.jobs import Worker
+    return Worker(app, concurrency=2).run(until_empty=True)
+
+
+def login(client, user_login, password='password123'):
+    return client.post('/login', data={'login': user_login, 'password': password})
+
+
+@contextmanager
+def count_queries():
+    """Собирает тексты SQL-запросов, выполненных внутри блока."""
+    with record_queries(keep_statements=True) as recording:
+        yield recording.statements
+
+
+@contextmanager
+def query_budget(max_queries=None, max_repeats=None):
+    """
+    Проверяет, что блок (например, запрос тестового клиента) уложился в max_queries
+    SQL-выражений и не выполнил одно и то же параметризованное выражение больше max_repeats раз.
+    """
+    with record_queries() as recording:
+        yield recording
+    problems = []
+    if max_queries is not None and recording.count > max_queries:
+        problems.append(f'выполнено {recording.count} SQL-выражений при бюджете {max_queries}')
+    if max_repeats is not None:
+        for shape, count in recording.repeated(max_repeats + 1):
+            problems.append(f'{count} раз: {shape[:300]}')
+    if problems:
+        raise AssertionError('Превышен бюджет запросов:\n' + '\n'.join(problems))
+
+
+def post_animal(client, files=(), name='Барсик'):
+    """Добавляет животное через форму; files - пары (содержимое, имя файла)."""
+    return client.post('/animal/add', data={
+        'name': name, 'description': 'Кот', 'age_in_months': 10, 'breed': 'Дворняга',
+        'gender': 'male', 'status': 'available',
+        'images': [(io.BytesIO(content), filename, 'image/jpeg') for content, filename in files],
+    }, content_type='multipart/form-data')
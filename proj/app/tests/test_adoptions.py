@@ -0,0 +1,188 @@
+import random
+import threading
+from app import db
+from app.adoptions import moderate_adoptions
+from app.models import Animal, Adoption
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def adoption_ids(animal):
+    return db.session.scalars(
+        db.select(Adoption.id).where(Adoption.animal_id == animal.id).order_by(Adoption.id)).all()
+
+
+def statuses(animal):
+    db.session.expire_all()
+    return db.session.get(Animal, animal.id).status, [
+        status for status in db.session.scalars(
+            db.select(Adoption.status).where(Adoption.animal_id == animal.id).order_by(Adoption.id))
+    ]
+
+
+def test_accept_adopts_animal_and_rejects_other_pending(app):
+    animal = make_animal(status='adoption', adoptions=3)
+    first, second, third = adoption_ids(animal)
+    result = moderate_adoptions({second: 'accept'})
+    db.session.commit()
+    assert result.accepted == [second]
+    assert result.animals == {animal.id: ('adoption', 'adopted')}
+    assert statuses(animal) == ('adopted', ['rejected_adopted', 'accepted', 'rejected_adopted'])
+
+
+def test_rejecting_last_pending_makes_animal_available(app):
+    animal = make_animal(status='adoption', adoptions=2)
+    first, second = adoption_ids(animal)
+    moderate_adoptions({first: 'reject'})
+    db.session.commit()
+    assert statuses(animal) == ('adoption', ['rejected', 'pending'])
+    moderate_adoptions({second: 'reject'})
+    db.session.commit()
+    assert statuses(animal) == ('available', ['rejected', 'rejected'])
+
+
+def test_batch_spans_animals_and_keeps_earliest_accept(app):
+    cat = make_animal('Барсик', status='adoption', adoptions=2)
+    dog = make_animal('Шарик', status='adoption', adoptions=1)
+    cat_first, cat_second = adoption_ids(cat)
+    [dog_only] = adoption_ids(dog)
+    result = moderate_adoptions({cat_second: 'accept', cat_first: 'accept', dog_only: 'reject'})
+    db.session.commit()
+    assert result.accepted == [cat_first]
+    assert result.rejected == [dog_only]
+    assert result.superseded == [cat_second]
+    assert statuses(cat) == ('adopted', ['accepted', 'rejected_adopted'])
+    assert statuses(dog) == ('available', ['rejected'])
+
+
+def test_second_accept_in_batch_is_reported_as_superseded(app):
+    animal = make_animal('Барсик', status='adoption', adoptions=2)
+    first, second = adoption_ids(animal)
+    result = moderate_adoptions({first: 'accept', second: 'accept'})
+    db.session.commit()
+    assert (result.accepted, result.rejected, result.superseded, result.skipped) == ([first], [], [second], [])
+    assert statuses(animal) == ('adopted', ['accepted', 'rejected_adopted'])
+
+
+def test_decided_and_missing_applications_are_skipped(app):
+    animal = make_animal(status='adoption', adoptions=2)
+    first, second = adoption_ids(animal)
+    moderate_adoptions({first: 'accept'})
+    db.session.commit()
+    result = moderate_adoptions({first: 'reject', second: 'accept', 999: 'accept'})
+    db.session.commit()
+    assert result.accepted == [] and result.rejected == []
+    assert sorted(result.skipped) == [first, second, 999]
+    assert statuses(animal) == ('adopted', ['accepted', 'rejected_adopted'])
+
+
+def test_batch_endpoint(client):
+    animal = make_animal(status='adoption', adoptions=3)
+    first, second, third = adoption_ids(animal)
+    make_user('moder', role_name='moderator')
+    login(client, 'moder')
+    response = client.post('/adoptions/moderate', data={'reject': [first, third], 'accept': [third]})
+    assert response.status_code == 302
+    assert statuses(animal) == ('adoption', ['rejected', 'pending', 'pending'])
+
+
+def test_batch_endpoint_requires_moderator(client):
+    animal = make_animal(status='adoption', adoptions=1)
+    make_user('ivan')
+    login(client, 'ivan')
+    client.post('/adoptions/moderate', data={'accept': adoption_ids(animal)})
+    assert statuses(animal) == ('adoption', ['pending'])
+
+
+def test_concurrent_moderation_keeps_invariants(app):
+    animals = [make_animal(f'Питомец {i}', status='adoption', adoptions=4) for i in range(4)]
+    ids = [adoption_id for animal in animals for adoption_id in adoption_ids(animal)]
+    errors = []
+
+    def moderator(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            for _ in range(5):
+                decisions = {adoption_id: rng.choice(['accept', 'reject']) for adoption_id in rng.sample(ids, 5)}
+                try:
+                    moderate_adoptions(decisions)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(e)
+            db.session.remove()
+
+    threads = [threading.Thread(target=moderator, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for animal in animals:
+        status, adoptions = statuses(animal)
+        accepted = adoptions.count('accepted')
+        pending = adoptions.count('pending')
+        assert counters(animal) == (len(adoptions), pending)
+        assert accepted <= 1
+        if status == 'adopted':
+            assert accepted == 1 and pending == 0
+        elif status == 'adoption':
+            assert accepted == 0 and pending >= 1
+        else:
+            assert status == 'available' and accepted == 0 and pending == 0
+
+
+def counters(animal):
+    db.session.expire_all()
+    animal = db.session.get(Animal, animal.id)
+    return animal.adoption_count, animal.pending_count
+
+
+def test_counters_follow_application_and_moderation(client):
+    animal = make_animal(status='adoption', adoptions=2)
+    first, second = adoption_ids(animal)
+    make_user('ivan')
+    login(client, 'ivan')
+    client.post(f'/animal/{animal.id}/apply', data={'contact_info': '+7 900 111-11-11'})
+    assert counters(animal) == (3, 3)
+
+    moderate_adoptions({first: 'reject'})
+    db.session.commit()
+    assert counters(animal) == (3, 2)
+    moderate_adoptions({second: 'accept'})
+    db.session.commit()
+    assert counters(animal) == (3, 0)
+
+
+def test_apply_makes_available_animal_pending(client):
+    animal = make_animal()
+    make_user('ivan')
+    login(client, 'ivan')
+    client.post(f'/animal/{animal.id}/apply', data={'contact_info': '+7 900 111-11-11'})
+    db.session.expire_all()
+    assert db.session.get(Animal, animal.id).status == 'adoption'
+    assert counters(animal) == (1, 1)
+
+
+def test_reject_runs_no_count_query(app):
+    animal = make_animal(status='adoption', adoptions=2)
+    with count_queries() as statements:
+        moderate_adoptions({adoption_ids(animal)[0]: 'reject'})
+        db.session.commit()
+    assert not any('count(' in statement.lower() for statement in statements)
+
+
+def test_check_adoption_counters_command(app):
+    animal = make_animal(status='adoption', adoptions=2)
+    db.session.execute(db.update(Animal).where(Animal.id == animal.id).values(adoption_count=7, pending_count=0))
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['check-adoption-counters'])
+    assert result.exit_code == 1
+    assert 'adoption_count 7 -> 2' in result.output
+    assert counters(animal) == (7, 0)
+
+    result = runner.invoke(args=['check-adoption-counters', '--repair', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert counters(animal) == (2, 2)
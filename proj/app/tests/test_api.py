@@ -0,0 +1,105 @@
+import gzip
+import json
+from app import db
+from app.models import Animal
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def get_json(client, url, **kwargs):
+    response = client.get(url, **kwargs)
+    return response, json.loads(response.get_data())
+
+
+def test_list_uses_keyset_cursors(client):
+    for i in range(5):
+        make_animal(f'Питомец {i}')
+    response, body = get_json(client, '/api/v1/animals?per_page=2')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert [animal['name'] for animal in body['data']] == ['Питомец 4', 'Питомец 3']
+    assert body['links']['prev'] is None
+
+    _, body = get_json(client, body['links']['next'])
+    assert [animal['name'] for animal in body['data']] == ['Питомец 2', 'Питомец 1']
+    assert body['links']['prev'] is not None
+
+
+def test_list_reuses_catalogue_query(client):
+    make_animal('Barsik', photos=2, adoptions=1)
+    with count_queries() as statements:
+        _, body = get_json(client, '/api/v1/animals')
+    assert len(statements) == 1
+    assert body['data'][0]['cover']['url'] == '/uploads/Barsik-0.jpg'
+    assert body['data'][0]['adoption_count'] == 1
+
+
+def test_sparse_fieldsets(client):
+    animal = make_animal('Барсик', photos=1)
+    _, body = get_json(client, '/api/v1/animals?fields=name,status')
+    assert body['data'] == [{'id': animal.id, 'name': 'Барсик', 'status': 'available'}]
+
+    _, body = get_json(client, f'/api/v1/animals/{animal.id}?fields=name,photos')
+    assert set(body['data']) == {'id', 'name', 'photos'}
+    assert len(body['data']['photos']) == 1
+
+    response, body = get_json(client, '/api/v1/animals?fields=name,secret')
+    assert response.status_code == 400
+    assert 'secret' in body['error']
+
+
+def test_detail_and_missing_animal(client):
+    animal = make_animal('Барсик')
+    _, body = get_json(client, f'/api/v1/animals/{animal.id}')
+    assert body['data']['description'] == 'Описание'
+    response, _ = get_json(client, '/api/v1/animals/999')
+    assert response.status_code == 404
+
+
+def test_conditional_get_returns_304(client):
+    animal = make_animal('Барсик')
+    response = client.get(f'/api/v1/animals/{animal.id}')
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    with count_queries() as statements:
+        response = client.get(f'/api/v1/animals/{animal.id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert statements == []
+
+
+def test_etag_changes_after_edit(client):
+    animal = make_animal('Барсик')
+    etag = client.get(f'/api/v1/animals/{animal.id}').headers['ETag']
+    make_user('admin', role_name='admin')
+    login(client, 'admin')
+    client.post(f'/animal/{animal.id}/edit', data={
+        'name': 'Мурзик', 'description': 'Кот', 'age_in_months': 10, 'breed': 'Дворняга',
+        'gender': 'male', 'status': 'available',
+    })
+    assert db.session.get(Animal, animal.id).name == 'Мурзик'
+    response = client.get(f'/api/v1/animals/{animal.id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_gzip_when_accepted(client):
+    for i in range(10):
+        make_animal(f'Питомец {i}')
+    response = client.get('/api/v1/animals', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.get_data()))['data']) == 10
+
+    plain = client.get('/api/v1/animals')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] == response.headers['ETag']
+
+
+def test_forged_host_does_not_reach_cached_documents(client):
+    make_animal('Barsik', photos=1)
+    for _ in range(3):
+        make_animal('Murzik')
+    forged = client.get('/api/v1/animals?per_page=2', headers={'Host': 'evil.example'}).get_data(as_text=True)
+    assert 'evil.example' not in forged
+    _, body = get_json(client, '/api/v1/animals?per_page=2')
+    assert body['links']['next'].startswith('/api/v1/animals?')
@@ -0,0 +1,91 @@
+from app.cache import TaggedLRUCache, catalogue_cache
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def test_lru_eviction_and_counters():
+    cache = TaggedLRUCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+    cache = TaggedLRUCache(max_size=10, ttl=5)
+    cache.set('a', 1)
+    now[0] += 6
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_invalidate_tag_drops_only_tagged_entries():
+    cache = TaggedLRUCache(max_size=10, ttl=60)
+    cache.set('page1', 'x', tags=['catalogue', 'animal:1'])
+    cache.set('page2', 'y', tags=['catalogue', 'animal:2'])
+    cache.set('card1', 'z', tags=['animal:1'])
+    cache.invalidate_tag('animal:1')
+    assert cache.get('page1') is None and cache.get('card1') is None
+    assert cache.get('page2') == 'y'
+
+
+def test_repeated_anonymous_view_is_served_from_cache(client):
+    make_animal('Барсик')
+    first = client.get('/').get_data(as_text=True)
+    with count_queries() as statements:
+        second = client.get('/').get_data(as_text=True)
+    assert statements == []
+    assert first == second
+    assert catalogue_cache.stats()['hits'] >= 1
+
+
+def test_viewer_classes_are_cached_separately(client):
+    make_animal('Барсик')
+    make_user('boss', role_name='admin')
+    assert 'Удалить' not in client.get('/').get_data(as_text=True)
+    login(client, 'boss')
+    assert 'Удалить' in client.get('/').get_data(as_text=True)
+
+
+def test_edit_invalidates_only_affected_entries(client):
+    first = make_animal('Барсик')
+    second = make_animal('Мурка')
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    client.get('/')
+    card_key = ('card', second.id, 'admin')
+    assert catalogue_cache.get(card_key) is not None
+
+    client.post(f'/animal/{first.id}/edit', data={
+        'name': 'Барсик Великий', 'description': 'Текст', 'age_in_months': 12,
+        'breed': 'Дворняга', 'gender': 'male', 'status': 'available',
+    })
+    assert catalogue_cache.get(('card', first.id, 'admin')) is None
+    assert catalogue_cache.get(card_key) is not None
+    assert 'Барсик Великий' in client.get('/').get_data(as_text=True)
+
+
+def test_adoption_updates_cached_card(client):
+    animal = make_animal('Барсик')
+    make_user('ivan')
+    assert '<strong>Заявок:</strong> 0' in client.get('/').get_data(as_text=True)
+    login(client, 'ivan')
+    client.post(f'/animal/{animal.id}/apply', data={'contact_info': '+7 900 000-00-00'})
+    client.get('/logout')
+    html = client.get('/').get_data(as_text=True)
+    assert '<strong>Заявок:</strong> 1' in html
+    assert 'Adoption' in html
+
+
+def test_disabled_cache_renders_every_time(app, client):
+    catalogue_cache.configure(0, 60)
+    make_animal('Барсик')
+    client.get('/')
+    with count_queries() as statements:
+        client.get('/')
+    assert statements
@@ -0,0 +1,50 @@
+from app import db
+from app.tests.conftest import make_animal, count_queries
+
+
+def test_index_shows_cover_and_adoption_count(client):
+    make_animal('Barsik', photos=2, adoptions=3)
+    response = client.get('/')
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'uploads/Barsik-0.jpg' in html
+    assert 'Barsik-1.jpg' not in html
+    assert '<strong>Заявок:</strong> 3' in html
+
+
+def test_index_query_count_does_not_depend_on_page_size(client):
+    for i in range(9):
+        make_animal(f'Питомец{i}', photos=2, adoptions=1)
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        response = client.get('/')
+    assert response.status_code == 200
+    # Один запрос на страницу карточек (курсорная пагинация обходится без COUNT)
+    # и один сгруппированный запрос для счётчиков фильтров
+    assert len(statements) == 2
+
+
+def test_index_does_not_load_description(client):
+    make_animal('Барсик', photos=1)
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        client.get('/')
+    page_query = next(s for s in statements if 'FROM animals' in s and 'count(*)' not in s)
+    assert 'animals.description' not in page_query
+
+
+def test_index_orders_by_status(client):
+    make_animal('Усыновлённый', status='adopted')
+    make_animal('Доступный', status='available')
+    html = client.get('/').get_data(as_text=True)
+    assert html.index('Доступный') < html.index('Усыновлённый')
+
+
+def test_status_rank_follows_status(client):
+    animal = make_animal('Барсик', status='available')
+    assert animal.status_rank == 1
+    animal.status = 'adopted'
+    db.session.commit()
+    assert animal.status_rank == 3
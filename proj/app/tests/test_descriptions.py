@@ -0,0 +1,56 @@
+from app import db
+from app.models import Animal
+from app.sanitize import render_markdown, clean_markdown
+from app.tests.conftest import make_animal, make_user, login
+
+
+def test_render_markdown_sanitizes_output():
+    html = render_markdown('**Ласковый** <script>alert(1)</script>\n\n# Заголовок')
+    assert '<strong>Ласковый</strong>' in html
+    assert '<h1>Заголовок</h1>' in html
+    assert '<script>' not in html
+
+
+def test_render_markdown_is_stateless_between_calls():
+    render_markdown('[ссылка][1]\n\n[1]: http://example.com')
+    assert 'example.com' not in render_markdown('[ссылка][1]')
+
+
+def test_clean_markdown_keeps_source_text():
+    assert clean_markdown('*мягкий* <iframe src="x"></iframe>') == '*мягкий* '
+
+
+def test_add_animal_stores_rendered_description(client):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    client.post('/animal/add', data={
+        'name': 'Барсик', 'description': '**Игривый** кот', 'age_in_months': 10,
+        'breed': 'Дворняга', 'gender': 'male', 'status': 'available',
+    })
+    animal = db.session.scalar(db.select(Animal).where(Animal.name == 'Барсик'))
+    assert animal.description == '**Игривый** кот'
+    assert animal.description_html == '<p><strong>Игривый</strong> кот</p>'
+
+
+def test_view_uses_stored_html(app, client):
+    animal = make_animal('Барсик')
+    animal.description_html = '<p>Сохранённый HTML</p>'
+    db.session.commit()
+
+    app.jinja_env.filters['markdown'] = lambda text: 'рендер при просмотре'
+    html = client.get(f'/animal/{animal.id}').get_data(as_text=True)
+    assert '<p>Сохранённый HTML</p>' in html
+    assert 'рендер при просмотре' not in html
+
+
+def test_backfill_command_fills_missing_html(app):
+    animals = [make_animal(f'Питомец{i}', description=f'*описание {i}*') for i in range(5)]
+    result = app.test_cli_runner().invoke(args=['backfill-descriptions', '--batch-size', '2'])
+    assert 'Всего обновлено: 5' in result.output
+
+    db.session.expire_all()
+    for i, animal in enumerate(animals):
+        assert animal.description_html == f'<p><em>описание {i}</em></p>'
+
+    result = app.test_cli_runner().invoke(args=['backfill-descriptions'])
+    assert 'Всего обновлено: 0' in result.output
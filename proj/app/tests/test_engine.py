@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from app import db
+from app.engine import InstrumentedQueuePool, engine_options
+from app.metrics import metrics
+from config import Config
+
+
+def config_for(uri, **overrides):
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.update(SQLALCHEMY_DATABASE_URI=uri, SQLALCHEMY_ENGINE_OPTIONS={})
+    config.update(overrides)
+    return config
+
+
+def test_postgres_options():
+    options = engine_options(config_for('postgresql://db/shelter', DB_POOL_SIZE=20, DB_STATEMENT_TIMEOUT_MS=5000))
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert options['pool_size'] == 20
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'options': '-c statement_timeout=5000'}
+
+
+def test_memory_sqlite_keeps_default_pool_and_explicit_options_win():
+    options = engine_options(config_for('sqlite://', SQLALCHEMY_ENGINE_OPTIONS={'pool_recycle': 5}))
+    assert 'pool_size' not in options and 'connect_args' not in options
+    assert options['pool_recycle'] == 5
+
+
+def test_app_engine_reports_checkouts_and_churn(app):
+    assert isinstance(db.engine.pool, InstrumentedQueuePool)
+    metrics.reset()
+    db.engine.dispose()
+    db.session.execute(text('SELECT 1'))
+    db.session.commit()
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['db.pool.checkouts'] >= 1
+    assert snapshot['counters']['db.pool.connections_opened'] >= 1
+    assert snapshot['histograms']['db.pool.checkout_wait']['count'] >= 1
+    assert snapshot['gauges']['db.pool.size'] == app.config['DB_POOL_SIZE']
+
+
+def test_exhausted_pool_is_counted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    metrics.reset()
+    held = engine.connect()
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    held.close()
+    engine.dispose()
+    counters = metrics.snapshot()['counters']
+    assert counters['db.pool.exhausted'] == 1
+    assert counters['db.pool.timeouts'] == 1
+    assert counters['db.pool.connections_closed'] == 1
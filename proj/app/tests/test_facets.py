@@ -0,0 +1,75 @@
+import re
+from app.facets import facet_counts, parse_filters
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+CARD_TITLE = re.compile(r'<h5 class="card-title">([^<]+)</h5>')
+
+
+def seed():
+    make_animal('Барсик', breed='Сиамская', gender='male', age_in_months=3)
+    make_animal('Мурка', breed='Сиамская', gender='female', age_in_months=30, status='adoption')
+    make_animal('Шарик', breed='Дворняга', gender='male', age_in_months=100, status='adopted')
+    make_animal('Жучка', breed='Дворняга', gender='female', age_in_months=8)
+
+
+def options(facets, name):
+    facet = next(f for f in facets if f.name == name)
+    return {option.value: option.count for option in facet.options}
+
+
+def test_parse_filters_drops_unknown_values():
+    assert parse_filters({'status': 'lost', 'gender': 'male', 'age': 'ancient', 'breed': ' Такса '}) == \
+        {'gender': 'male', 'breed': 'Такса'}
+
+
+def test_counts_exclude_own_facet_filter(app):
+    seed()
+    facets, total = facet_counts({'gender': 'male'})
+    assert total == 2
+    assert options(facets, 'gender') == {'male': 2, 'female': 2}
+    assert options(facets, 'breed') == {'Дворняга': 1, 'Сиамская': 1}
+    assert options(facets, 'age') == {'baby': 1, 'young': 0, 'adult': 0, 'mature': 0, 'senior': 1}
+    assert options(facets, 'status') == {'available': 1, 'adoption': 0, 'adopted': 1}
+
+
+def test_counts_use_one_query_and_are_cached(app):
+    seed()
+    with count_queries() as statements:
+        facet_counts({'breed': 'Сиамская'})
+        facet_counts({'breed': 'Сиамская'})
+    assert len(statements) == 1
+    assert 'GROUP BY' in statements[0]
+
+
+def test_index_filters_cards(client):
+    seed()
+    html = client.get('/?breed=Дворняга&gender=female').get_data(as_text=True)
+    assert CARD_TITLE.findall(html) == ['Жучка']
+    assert 'Найдено: 1' in html
+
+    html = client.get('/?age=adult').get_data(as_text=True)
+    assert CARD_TITLE.findall(html) == ['Мурка']
+
+
+def test_filters_survive_keyset_pagination(app, client):
+    app.config['CATALOGUE_PER_PAGE'] = 1
+    seed()
+    html = client.get('/?breed=Сиамская').get_data(as_text=True)
+    next_url = re.search(r'href="(/\?[^"]*after=[^"]+)"', html).group(1).replace('&amp;', '&')
+    assert 'breed=' in next_url
+    assert CARD_TITLE.findall(client.get(next_url).get_data(as_text=True)) == ['Мурка']
+
+
+def test_editing_breed_refreshes_filtered_pages_and_counts(client):
+    seed()
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    assert CARD_TITLE.findall(client.get('/?breed=Сиамская').get_data(as_text=True)) == ['Барсик', 'Мурка']
+
+    client.post('/animal/4/edit', data={
+        'name': 'Жучка', 'description': 'Текст', 'age_in_months': 8,
+        'breed': 'Сиамская', 'gender': 'female', 'status': 'available',
+    })
+    html = client.get('/?breed=Сиамская').get_data(as_text=True)
+    assert CARD_TITLE.findall(html) == ['Жучка', 'Барсик', 'Мурка']
+    assert options(facet_counts({})[0], 'breed') == {'Дворняга': 1, 'Сиамская': 3}
@@ -0,0 +1,69 @@
+from flask import g
+from app import db
+from app.cache import identity_cache
+from app.models import Role, User, load_user
+from app.permissions import role_table
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def get(client, url):
+    # Запросы тестового клиента делят контекст приложения с тестом, поэтому
+    # сбрасываем пользователя, которого Flask-Login запомнил в g, как в новом запросе
+    g.pop('_login_user', None)
+    return client.get(url)
+
+
+def logged_in_user(client, role_name='user'):
+    user_id = make_user('ivan', role_name=role_name).id
+    login(client, 'ivan')
+    get(client, '/')
+    return user_id
+
+
+def test_load_user_fetches_role_in_one_query(app):
+    user_id = make_user('ivan', role_name='moderator').id
+    db.session.expunge_all()
+    role_table()
+
+    with count_queries() as statements:
+        loaded = load_user(str(user_id))
+        assert loaded.role.name == 'moderator'
+        assert loaded.is_moderator and not loaded.is_admin
+    assert len(statements) == 1
+
+
+def test_authenticated_page_views_reuse_cached_identity(client):
+    make_animal('Барсик')
+    logged_in_user(client)
+
+    with count_queries() as statements:
+        html = get(client, '/').get_data(as_text=True)
+    assert statements == []
+    assert 'Тестов Тест (Пользователь)' in html
+
+
+def test_user_change_invalidates_cached_identity(client):
+    user_id = logged_in_user(client)
+    assert identity_cache.get(user_id) is not None
+
+    db.session.get(User, user_id).first_name = 'Иван'
+    db.session.commit()
+    assert identity_cache.get(user_id) is None
+    assert 'Тестов Иван' in get(client, '/').get_data(as_text=True)
+
+
+def test_role_change_invalidates_its_users(client):
+    user_id = logged_in_user(client)
+    role = db.session.scalar(db.select(Role).where(Role.name == 'user'))
+    role.description = 'Посетитель'
+    db.session.commit()
+    assert identity_cache.get(user_id) is None
+    assert '(Посетитель)' in get(client, '/').get_data(as_text=True)
+
+
+def test_rolled_back_change_keeps_cache(client):
+    user_id = logged_in_user(client)
+    db.session.get(User, user_id).first_name = 'Иван'
+    db.session.flush()
+    db.session.rollback()
+    assert identity_cache.get(user_id) is not None
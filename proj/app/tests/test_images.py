@@ -0,0 +1,78 @@
+import io
+import os
+import pytest
+from app import db
+from app.images import build_variants, image_pipeline
+from app.models import Photo
+from app.tests.conftest import make_user, login, post_animal, run_jobs
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_jpeg(width=1600, height=1000):
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'  # Make
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(buffer, 'JPEG', exif=exif)
+    buffer.seek(0)
+    return buffer
+
+
+def upload_animal(client, *images):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    return post_animal(client, [(image.read(), f'photo{i}.jpg') for i, image in enumerate(images)])
+
+
+def test_build_variants_resizes_and_strips_exif(tmp_path):
+    source = tmp_path / 'cat.jpg'
+    source.write_bytes(make_jpeg().read())
+
+    width, height, variants = build_variants(str(source), str(tmp_path), 'cat', (320, 640, 4000), 80)
+    assert (width, height) == (1600, 1000)
+    assert sorted({v['width'] for v in variants}) == [320, 640, 1600]
+    assert {v['format'] for v in variants} == {'jpg', 'webp'}
+
+    for variant in variants:
+        with Image.open(tmp_path / variant['filename']) as image:
+            assert image.size == (variant['width'], variant['height'])
+            assert not image.getexif()
+
+
+def test_upload_records_variants_and_catalogue_uses_srcset(app, client):
+    upload_animal(client, make_jpeg())
+    photo = db.session.scalar(db.select(Photo))
+    assert (photo.width, photo.height) == (1600, 1000)
+    assert len(photo.variants_of('webp')) == 3
+
+    html = client.get('/').get_data(as_text=True)
+    assert 'type="image/webp"' in html
+    assert '_320w.jpg 320w' in html
+
+
+def test_background_workers_process_uploads(app, client, monkeypatch):
+    app.config['IMAGE_WORKERS'] = 2
+    image_pipeline.init_app(app)
+    futures = []
+    submit = image_pipeline.submit
+    monkeypatch.setattr(image_pipeline, 'submit', lambda ids: futures.extend(submit(ids)) or futures)
+
+    upload_animal(client, make_jpeg(), make_jpeg(800, 600))
+    assert len(futures) == 2
+    for future in futures:
+        future.result(timeout=30)
+
+    db.session.expire_all()
+    assert all(photo.variants for photo in db.session.scalars(db.select(Photo)))
+
+
+def test_delete_removes_variant_files(app, client):
+    upload_animal(client, make_jpeg())
+    photo = db.session.scalar(db.select(Photo))
+    paths = [os.path.join(app.config['UPLOAD_FOLDER'], v['filename']) for v in photo.variants]
+    assert all(os.path.exists(path) for path in paths)
+
+    client.post(f'/animal/{photo.animal_id}/delete')
+    assert all(os.path.exists(path) for path in paths)
+    run_jobs(app)
+    assert not any(os.path.exists(path) for path in paths)
@@ -0,0 +1,172 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from app import db
+from app.jobs import enqueue, job_handler, job_metrics, queue_stats, backoff_delay, purge_finished_jobs, Worker
+from app.models import Job, Animal
+from app.tests.conftest import make_user, login, post_animal, run_jobs
+
+calls = []
+
+
+@job_handler('test_record')
+def record_job(payload):
+    calls.append(payload['value'])
+
+
+@job_handler('test_flaky')
+def flaky_job(payload):
+    calls.append('attempt')
+    if len(calls) < payload['fail_times'] + 1:
+        raise RuntimeError('temporary failure')
+
+
+def setup_function():
+    calls.clear()
+    job_metrics.reset()
+
+
+def test_enqueued_job_runs_after_commit(app):
+    enqueue('test_record', {'value': 1})
+    db.session.commit()
+    assert run_jobs(app) == 1
+    assert calls == [1]
+    assert queue_stats() == {'done': 1}
+    assert job_metrics.snapshot()['counters']['test_record:succeeded'] == 1
+
+
+def test_rolled_back_job_is_never_run(app):
+    enqueue('test_record', {'value': 1})
+    db.session.rollback()
+    assert run_jobs(app) == 0
+    assert calls == []
+
+
+def test_idempotency_key_deduplicates(app):
+    enqueue('test_record', {'value': 1}, idempotency_key='once')
+    db.session.commit()
+    enqueue('test_record', {'value': 2}, idempotency_key='once')
+    db.session.commit()
+    run_jobs(app)
+    assert calls == [1]
+
+
+def test_failed_job_is_retried_with_backoff(app):
+    app.config['JOB_BACKOFF_BASE'] = 60
+    enqueue('test_flaky', {'fail_times': 1})
+    db.session.commit()
+    run_jobs(app)
+
+    job = db.session.scalar(db.select(Job))
+    assert job.status == 'queued' and job.attempts == 1
+    assert 'temporary failure' in job.last_error
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=30)
+
+    job.run_at = datetime.utcnow()
+    db.session.commit()
+    run_jobs(app)
+    db.session.expire_all()
+    assert db.session.get(Job, job.id).status == 'done'
+    assert job_metrics.snapshot()['counters'] == {
+        'retried': 1, 'test_flaky:retried': 1, 'succeeded': 1, 'test_flaky:succeeded': 1}
+
+
+def test_job_fails_after_max_attempts(app):
+    enqueue('test_flaky', {'fail_times': 10}, max_attempts=1)
+    db.session.commit()
+    run_jobs(app)
+    job = db.session.scalar(db.select(Job))
+    assert job.status == 'failed' and job.finished_at is not None
+
+
+def test_expired_lease_is_reclaimed(app):
+    db.session.add(Job(kind='test_record', payload={'value': 7}, status='running', attempts=1,
+                       locked_by='dead', locked_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    run_jobs(app)
+    assert calls == [7]
+
+
+def test_expired_lease_without_attempts_left_fails(app):
+    db.session.add(Job(kind='test_record', payload={'value': 7}, status='running', attempts=3, max_attempts=3,
+                       locked_by='dead', locked_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    assert run_jobs(app) == 0
+    assert calls == []
+    job = db.session.scalar(db.select(Job))
+    assert job.status == 'failed' and job.attempts == 3 and job.locked_by is None
+    assert 'Аренда истекла' in job.last_error
+
+
+def test_slow_worker_does_not_overwrite_reclaimed_job(app):
+    enqueue('test_record', {'value': 1})
+    db.session.commit()
+    slow, fast = Worker(app, concurrency=1), Worker(app, concurrency=1)
+    with app.app_context():
+        [job] = slow.claim()
+    # Аренда медленного воркера истекла, задачу забрал другой воркер
+    db.session.execute(db.update(Job).values(locked_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    with app.app_context():
+        [reclaimed] = fast.claim()
+    assert reclaimed.locked_by != job.locked_by
+
+    slow.run_job(job)
+    db.session.expire_all()
+    current = db.session.scalar(db.select(Job))
+    assert current.status == 'running' and current.locked_by == reclaimed.locked_by
+    assert job_metrics.snapshot()['counters']['lease_lost'] == 1
+
+    fast.run_job(reclaimed)
+    db.session.expire_all()
+    assert db.session.scalar(db.select(Job.status)) == 'done'
+
+
+def test_concurrent_workers_run_each_job_once(app):
+    for value in range(30):
+        enqueue('test_record', {'value': value})
+    db.session.commit()
+    workers = [Worker(app, concurrency=3, batch_size=4) for _ in range(3)]
+    threads = [threading.Thread(target=worker.run, kwargs={'until_empty': True}) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == list(range(30))
+
+
+def test_backoff_grows_and_is_capped():
+    assert 1.5 <= backoff_delay(1, 2, 600) <= 2.5
+    assert 12 <= backoff_delay(4, 2, 600) <= 20
+    assert backoff_delay(20, 2, 600) <= 750
+
+
+def test_purge_finished_jobs(app):
+    db.session.add(Job(kind='test_record', payload={}, status='done', finished_at=datetime.utcnow() - timedelta(days=30)))
+    db.session.add(Job(kind='test_record', payload={}, status='queued'))
+    db.session.commit()
+    assert purge_finished_jobs(3600) == 1
+    assert queue_stats() == {'queued': 1}
+
+
+def test_delete_animal_enqueues_file_cleanup(app, client):
+    make_user('admin', role_name='admin')
+    login(client, 'admin')
+    post_animal(client, [(b'image', 'a.jpg')])
+    animal = db.session.scalar(db.select(Animal))
+    client.post(f'/animal/{animal.id}/delete')
+    job = db.session.scalar(db.select(Job))
+    assert job.kind == 'remove_files'
+    [[filename, _]] = job.payload['files']
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    run_jobs(app)
+    assert not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+
+
+def test_worker_cli(app):
+    enqueue('test_record', {'value': 3})
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['worker', '--until-empty', '--concurrency', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Выполнено задач: 1' in result.output
+    assert calls == [3]
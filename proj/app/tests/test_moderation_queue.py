@@ -0,0 +1,87 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.adoptions import moderation_queue_page
+from app.models import Adoption
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def make_queue(count):
+    animal = make_animal(status='adoption', adoptions=count)
+    start = datetime(2026, 1, 1)
+    for i, adoption in enumerate(db.session.scalars(db.select(Adoption).order_by(Adoption.id))):
+        adoption.application_date = start + timedelta(hours=i)
+    db.session.commit()
+    return animal
+
+
+def moderator_client(client):
+    make_user('moder', role_name='moderator')
+    login(client, 'moder')
+    return client
+
+
+def test_queue_is_newest_first_and_loads_relations_in_one_query(app):
+    make_queue(5)
+    db.session.execute(db.update(Adoption).where(Adoption.id == 5).values(status='rejected'))
+    db.session.commit()
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        page = moderation_queue_page(per_page=3)
+        names = [(adoption.id, adoption.animal.name, adoption.user.login) for adoption in page]
+    assert len(statements) == 1
+    assert [adoption_id for adoption_id, _, _ in names] == [4, 3, 2]
+    assert names[0][2] == 'Барсик-applicant-3'
+
+    page = moderation_queue_page(after=page.next_cursor, per_page=3)
+    assert [adoption.id for adoption in page] == [1]
+    assert not page.has_next and page.has_prev
+
+
+def test_queue_query_uses_composite_index(app):
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM adoptions WHERE status = 'pending' "
+        "ORDER BY application_date DESC, id DESC LIMIT 25"
+    )).all()
+    assert any('ix_adoptions_queue' in row[-1] for row in plan)
+
+
+def test_queue_page_renders_for_moderator(client):
+    make_queue(2)
+    html = moderator_client(client).get('/adoptions/queue').get_data(as_text=True)
+    assert 'Барсик-applicant-1' in html
+    assert 'name="accept" value="1"' in html
+
+
+def test_queue_requires_moderator(client):
+    make_user('ivan')
+    login(client, 'ivan')
+    assert client.get('/adoptions/queue').status_code == 302
+    assert client.get('/adoptions/queue.csv').status_code == 302
+
+
+def test_queue_csv_is_streamed(client):
+    make_queue(3)
+    response = moderator_client(client).get('/adoptions/queue.csv')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:4] == ['id', 'application_date', 'animal_id', 'animal']
+    assert [row[0] for row in rows[1:]] == ['3', '2', '1']
+    assert rows[1][4] == 'Барсик-applicant-2'
+
+
+def test_queue_csv_neutralizes_formulas(client):
+    animal = make_queue(1)
+    animal.name = '=HYPERLINK("http://evil.example","x")'
+    adoption = db.session.scalar(db.select(Adoption))
+    adoption.contact_info = '@SUM(1+1)*cmd'
+    adoption.user.last_name = '-2+3'
+    db.session.commit()
+    rows = list(csv.reader(io.StringIO(moderator_client(client).get('/adoptions/queue.csv').get_data(as_text=True))))
+    assert rows[1][3] == '\'=HYPERLINK("http://evil.example","x")'
+    assert rows[1][5] == "'-2+3"
+    assert rows[1][7] == "'@SUM(1+1)*cmd"
@@ -0,0 +1,112 @@
+import base64
+import json
+import re
+import pytest
+from datetime import datetime
+from app import db
+from app.models import Animal
+from app.pagination import encode_cursor, decode_cursor
+from app.tests.conftest import make_animal, count_queries
+
+CARD_TITLE = re.compile(r'<h5 class="card-title">([^<]+)</h5>')
+NEXT_LINK = re.compile(r'href="(/\?after=[^"]+)"')
+PREV_LINK = re.compile(r'href="(/\?before=[^"]+)"')
+
+
+def titles(html):
+    return CARD_TITLE.findall(html)
+
+
+def seed(count):
+    same_time = datetime(2025, 1, 1, 12, 0)
+    for i in range(count):
+        status = ['available', 'adoption', 'adopted'][i % 3]
+        # Часть животных с одинаковым created_at, чтобы порядок решал id
+        created_at = same_time if i % 2 else datetime(2025, 1, 1 + i % 20, 8, 0)
+        make_animal(f'Pet{i:02d}', status=status, created_at=created_at)
+
+
+def expected_order():
+    rank = {'available': 1, 'adoption': 2, 'adopted': 3}
+    animals = db.session.scalars(db.select(Animal)).all()
+    animals.sort(key=lambda a: (rank[a.status], -a.created_at.timestamp(), a.id))
+    return [a.name for a in animals]
+
+
+def test_cursor_roundtrip():
+    values = (2, datetime(2025, 6, 14, 15, 30, 53, 120000), 42)
+    assert decode_cursor(encode_cursor(values)) == values
+    assert decode_cursor('не-курсор') is None
+
+
+def test_keyset_walks_all_pages_forward_and_back(app, client):
+    app.config['CATALOGUE_PER_PAGE'] = 4
+    seed(10)
+    expected = expected_order()
+
+    pages, url = [], '/'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(titles(html))
+        match = NEXT_LINK.search(html)
+        url = match.group(1).replace('&amp;', '&') if match else None
+
+    assert [name for page in pages for name in page] == expected
+    assert [len(page) for page in pages] == [4, 4, 2]
+
+    html = client.get(NEXT_LINK.search(client.get('/').get_data(as_text=True)).group(1)).get_data(as_text=True)
+    back = client.get(PREV_LINK.search(html).group(1)).get_data(as_text=True)
+    assert titles(back) == pages[0]
+    assert not PREV_LINK.search(back)
+
+
+def test_keyset_deep_page_runs_single_query(app, client):
+    app.config['CATALOGUE_PER_PAGE'] = 3
+    seed(9)
+    html = client.get('/').get_data(as_text=True)
+    url = NEXT_LINK.search(html).group(1)
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        client.get(url)
+    assert len(statements) == 1
+
+
+def test_invalid_cursor_falls_back_to_first_page(client):
+    seed(3)
+    assert titles(client.get('/?after=broken').get_data(as_text=True)) == expected_order()
+
+
+def tampered(packed):
+    return base64.urlsafe_b64encode(json.dumps(packed).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('packed', [
+    [{'a': 1}, [1]],
+    [['v', {'a': 1}], ['v', [1]], ['v', 1]],
+    [['v', 1], ['d', '2025-01-01T00:00:00']],
+    [['v', 1], ['d', 'не дата'], ['v', 1]],
+    [['v', 'строка'], ['d', '2025-01-01T00:00:00'], ['v', 1]],
+    [['v', 1], ['v', 5], ['v', 1]],
+    {'v': 1},
+])
+def test_tampered_cursor_falls_back_to_first_page(client, packed):
+    seed(3)
+    assert titles(client.get(f'/?after={tampered(packed)}').get_data(as_text=True)) == expected_order()
+    response = client.get(f'/api/v1/animals?before={tampered(packed)}')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 3
+
+
+def test_approximate_total(app, client):
+    app.config['CATALOGUE_APPROXIMATE_COUNT'] = True
+    seed(5)
+    assert 'Всего питомцев: около 5' in client.get('/').get_data(as_text=True)
+
+
+def test_offset_mode_still_available(app, client):
+    app.config['CATALOGUE_PAGINATION'] = 'offset'
+    app.config['CATALOGUE_PER_PAGE'] = 4
+    seed(6)
+    html = client.get('/?page=2').get_data(as_text=True)
+    assert titles(html) == expected_order()[4:]
@@ -0,0 +1,70 @@
+import threading
+import time
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User
+from app.passwords import PasswordHasher, canonical_method
+from app.tests.conftest import make_user
+
+
+def test_canonical_method_fills_werkzeug_defaults():
+    assert canonical_method('scrypt') == 'scrypt:32768:8:1'
+    assert canonical_method('pbkdf2') == 'pbkdf2:sha256:600000'
+    assert canonical_method('pbkdf2:sha256:1000') == 'pbkdf2:sha256:1000'
+
+
+def test_needs_rehash_compares_method_and_salt():
+    hasher = PasswordHasher()
+    hasher.configure('pbkdf2:sha256:1000', 16, 0)
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:500', 16))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:1000', 8))
+
+
+def test_login_upgrades_outdated_hash(client):
+    user = make_user('ivan')
+    user.password_hash = generate_password_hash('password123', 'pbkdf2:sha256:500')
+    db.session.commit()
+
+    response = client.post('/login', data={'login': 'ivan', 'password': 'password123'})
+    assert response.status_code == 302
+
+    db.session.expire_all()
+    user = db.session.scalar(db.select(User).where(User.login == 'ivan'))
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    assert user.check_password('password123')
+
+
+def test_failed_login_keeps_outdated_hash(client):
+    user = make_user('ivan')
+    old_hash = user.password_hash = generate_password_hash('password123', 'pbkdf2:sha256:500')
+    db.session.commit()
+
+    client.post('/login', data={'login': 'ivan', 'password': 'wrong-password'})
+    db.session.expire_all()
+    assert db.session.scalar(db.select(User.password_hash).where(User.login == 'ivan')) == old_hash
+
+
+def test_executor_bounds_concurrent_hashing(monkeypatch):
+    active = peak = 0
+    lock = threading.Lock()
+
+    def slow_hash(password, method, salt_length):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return 'hash'
+
+    monkeypatch.setattr('app.passwords.generate_password_hash', slow_hash)
+    hasher = PasswordHasher()
+    hasher.configure('pbkdf2:sha256:1000', 16, 2)
+    threads = [threading.Thread(target=hasher.hash, args=('secret',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
@@ -0,0 +1,63 @@
+from app import db
+from app.models import Role, User
+from app.permissions import Permission, role_table, has_permission
+from app.tests.conftest import make_animal, make_user, login, count_queries
+
+
+def test_role_table_maps_ids_to_permission_masks(app):
+    table = role_table()
+    admin_id = table.id_of('admin')
+    assert table.name_of(admin_id) == 'admin'
+    assert Permission.DELETE_ANIMAL in table.permissions_of(admin_id)
+    assert Permission.APPLY_FOR_ADOPTION not in table.permissions_of(admin_id)
+    assert table.permissions_of(table.id_of('moderator')) == Permission.EDIT_ANIMAL | Permission.MODERATE_ADOPTIONS
+    assert table.permissions_of(999) == Permission(0)
+
+
+def test_permission_check_does_not_query_database(app):
+    user = make_user('ivan', role_name='moderator')
+    user.role_id
+    role_table()
+    with count_queries() as statements:
+        assert has_permission(user, Permission.EDIT_ANIMAL)
+        assert not has_permission(user, Permission.DELETE_ANIMAL)
+        assert user.is_moderator and not user.is_admin
+    assert statements == []
+
+
+def test_role_changes_refresh_table_after_commit(app):
+    table = role_table()
+    db.session.add(Role(name='volunteer', description='Волонтёр'))
+    db.session.commit()
+    assert role_table() is not table
+    assert role_table().id_of('volunteer') is not None
+    assert role_table().permissions_of(role_table().id_of('volunteer')) == Permission(0)
+
+
+def test_register_uses_cached_user_role(client):
+    role_table()
+    with count_queries() as statements:
+        client.post('/register', data={
+            'login': 'newbie', 'password': 'password123', 'password2': 'password123',
+            'last_name': 'Иванов', 'first_name': 'Иван',
+        })
+    assert User.query.filter_by(login='newbie').one().role_id == role_table().id_of('user')
+    assert not any('FROM roles' in statement for statement in statements)
+
+
+def test_templates_use_can_helper(client):
+    animal = make_animal('Барсик')
+    make_user('mod', role_name='moderator')
+    login(client, 'mod')
+    html = client.get('/').get_data(as_text=True)
+    assert f'/animal/{animal.id}/edit' in html
+    assert 'data-bs-target="#deleteAnimalModal"' not in html
+
+
+def test_permission_required_redirects_without_permission(client):
+    animal = make_animal('Барсик')
+    make_user('ivan')
+    login(client, 'ivan')
+    response = client.post(f'/animal/{animal.id}/delete')
+    assert response.status_code == 302
+    assert db.session.get(type(animal), animal.id) is not None
@@ -0,0 +1,109 @@
+from app.ratelimit import FileBackend, MemoryBackend, parse_limit, rate_limiter
+from app import create_app
+from app.tests.conftest import TestConfig, make_user
+
+
+def post_login(client, login, ip='10.0.0.1'):
+    return client.post('/login', data={'login': login, 'password': 'wrong-password'},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_parse_limit():
+    assert parse_limit('10/minute') == (10, 60)
+    assert parse_limit('5 / hour') == (5, 3600)
+
+
+def test_login_is_limited_per_ip(app, client):
+    rate_limiter.limits['login'] = (3, 60)
+    for i in range(3):
+        assert post_login(client, f'user{i}').status_code == 302
+    response = post_login(client, 'user9')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert post_login(client, 'user9', ip='10.0.0.2').status_code == 302
+    assert rate_limiter.stats() == {'login:ip': 1}
+
+
+def test_login_is_limited_per_login_across_ips(app, client):
+    rate_limiter.limits['login'] = (2, 60)
+    assert post_login(client, 'ivan', ip='10.0.0.1').status_code == 302
+    assert post_login(client, 'IVAN', ip='10.0.0.2').status_code == 302
+    assert post_login(client, 'ivan', ip='10.0.0.3').status_code == 429
+    assert rate_limiter.stats() == {'login:login': 1}
+
+
+def test_rejected_login_skips_hashing_and_database(app, client, monkeypatch):
+    make_user('ivan')
+    rate_limiter.limits['login'] = (1, 60)
+    post_login(client, 'ivan')
+
+    def fail(*args):
+        raise AssertionError('password hashed for a rejected request')
+    monkeypatch.setattr('app.models.password_hasher.verify', fail)
+    monkeypatch.setattr('app.routes.db.session.scalar', fail)
+    assert post_login(client, 'ivan').status_code == 429
+
+
+def test_get_requests_are_not_limited(app, client):
+    rate_limiter.limits['login'] = (1, 60)
+    for _ in range(3):
+        assert client.get('/login').status_code == 200
+
+
+def test_bucket_refills_over_time():
+    backend = MemoryBackend()
+    assert backend.consume(['k'], 1, 1.0, now=100.0) == (None, 0)
+    key, wait = backend.consume(['k'], 1, 1.0, now=100.5)
+    assert key == 'k' and wait == 0.5
+    assert backend.consume(['k'], 1, 1.0, now=101.0) == (None, 0)
+
+
+def test_rejection_does_not_consume_other_buckets():
+    backend = MemoryBackend()
+    backend.consume(['ip'], 1, 0.1, now=0)
+    assert backend.consume(['ip', 'login'], 1, 0.1, now=0)[0] == 'ip'
+    assert backend.consume(['login'], 1, 0.1, now=0) == (None, 0)
+
+
+def test_memory_backend_evicts_least_recently_used_buckets():
+    backend = MemoryBackend(max_keys=3)
+    for key in ('a', 'b', 'c'):
+        backend.consume([key], 1, 0.001, now=0)
+    backend.consume(['d'], 1, 0.001, now=0)
+    assert list(backend.buckets) == ['b', 'c', 'd']
+    assert backend.consume(['c'], 1, 0.001, now=0)[0] == 'c'
+
+
+def login_via_proxy(client, login, forwarded_for):
+    return client.post('/login', data={'login': login, 'password': 'x'},
+                       environ_base={'REMOTE_ADDR': '10.0.0.254'}, headers={'X-Forwarded-For': forwarded_for})
+
+
+def test_client_ip_comes_from_trusted_proxy(app):
+    class _Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = app.config['SQLALCHEMY_DATABASE_URI']
+        UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
+        TRUSTED_PROXY_COUNT = 1
+
+    client = create_app(_Config).test_client()
+    rate_limiter.limits['login'] = (1, 60)
+    assert login_via_proxy(client, 'a', '203.0.113.1').status_code == 302
+    # Другой клиент за тем же прокси не упирается в чужой лимит
+    assert login_via_proxy(client, 'b', '203.0.113.2').status_code == 302
+    assert login_via_proxy(client, 'c', '203.0.113.1').status_code == 429
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxy(app, client):
+    assert app.config['TRUSTED_PROXY_COUNT'] == 0
+    rate_limiter.limits['login'] = (1, 60)
+    assert login_via_proxy(client, 'a', '203.0.113.1').status_code == 302
+    # Поддельный X-Forwarded-For не даёт новую корзину: лимит считается по REMOTE_ADDR
+    assert login_via_proxy(client, 'b', '203.0.113.2').status_code == 429
+
+
+def test_file_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'ratelimit.db')
+    first, second = FileBackend(path), FileBackend(path)
+    assert first.consume(['k'], 2, 0.01, now=0) == (None, 0)
+    assert second.consume(['k'], 2, 0.01, now=0) == (None, 0)
+    assert first.consume(['k'], 2, 0.01, now=0)[0] == 'k'
@@ -0,0 +1,81 @@
+import re
+from sqlalchemy import text
+from app import db
+from app import search
+from app.models import Animal
+from app.search import search_animal_ids
+from app.tests.conftest import make_animal, make_user, login
+
+CARD_TITLE = re.compile(r'<h5 class="card-title">([^<]+)</h5>')
+
+
+def seed_indexed(app):
+    make_animal('Барсик', breed='Сиамская', description='Ласковый кот, любит спать')
+    make_animal('Шарик', breed='Дворняга', description='Весёлый пёс, дружит с котами')
+    make_animal('Мурка', breed='Британская', description='Спокойная кошка')
+    app.test_cli_runner().invoke(args=['rebuild-search-index'])
+
+
+def test_search_ranks_name_and_breed_above_description(app, client):
+    seed_indexed(app)
+    html = client.get('/search?q=кот').get_data(as_text=True)
+    assert CARD_TITLE.findall(html) == ['Барсик', 'Шарик']
+    assert 'Найдено: 2' in html
+
+    assert CARD_TITLE.findall(client.get('/search?q=британская').get_data(as_text=True)) == ['Мурка']
+
+
+def test_search_is_paginated(app, client):
+    for i in range(5):
+        make_animal(f'Рыжик{i}', description='рыжий кот')
+    app.config['CATALOGUE_PER_PAGE'] = 2
+    app.test_cli_runner().invoke(args=['rebuild-search-index'])
+
+    ids, total = search_animal_ids('рыжий', page=3, per_page=2)
+    assert total == 5 and len(ids) == 1
+    html = client.get('/search?q=рыжий&page=2').get_data(as_text=True)
+    assert len(CARD_TITLE.findall(html)) == 2
+    assert '2 из 3' in html
+
+
+def test_search_tolerates_fts_syntax_in_query(app, client):
+    seed_indexed(app)
+    assert client.get('/search?q=кот" OR NEAR(').status_code == 200
+    assert 'Найдено: 0' in client.get('/search?q=***').get_data(as_text=True)
+
+
+def test_index_is_updated_by_add_edit_and_delete(client):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    form = {'name': 'Снежок', 'description': 'Белый пушистый', 'age_in_months': 5,
+            'breed': 'Ангорская', 'gender': 'male', 'status': 'available'}
+    client.post('/animal/add', data=form)
+    animal = db.session.scalar(db.select(Animal).where(Animal.name == 'Снежок'))
+    assert search_animal_ids('пушистый') == ([animal.id], 1)
+
+    client.post(f'/animal/{animal.id}/edit', data=dict(form, description='Чёрный гладкий'))
+    assert search_animal_ids('пушистый') == ([], 0)
+    assert search_animal_ids('гладкий') == ([animal.id], 1)
+
+    client.post(f'/animal/{animal.id}/delete')
+    assert search_animal_ids('гладкий') == ([], 0)
+
+
+def test_index_reads_edited_row_from_database(client, monkeypatch):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    animal = make_animal('Снежок', breed='Ангорская', description='Белый пушистый')
+    animal_id = animal.id
+    indexed_rows = []
+
+    def spy(target):
+        search.index_animal(target)
+        # Документ PostgreSQL строится из строки в БД: к этому моменту она должна содержать новые значения
+        indexed_rows.append(tuple(db.session.execute(
+            text('SELECT name, breed, description FROM animals WHERE id = :id'), {'id': target.id}).one()))
+    monkeypatch.setattr('app.routes.index_animal', spy)
+
+    client.post(f'/animal/{animal_id}/edit', data={
+        'name': 'Уголёк', 'description': 'Чёрный гладкий', 'age_in_months': 5,
+        'breed': 'Бомбейская', 'gender': 'male', 'status': 'available'})
+    assert indexed_rows == [('Уголёк', 'Бомбейская', 'Чёрный гладкий')]
@@ -0,0 +1,65 @@
+from app import db
+from app.models import User, Animal, Photo, Adoption
+from app.seed import seed_database, SEED_PASSWORD
+
+
+def snapshot():
+    return (
+        db.session.execute(db.select(User.login, User.role_id).order_by(User.id)).all(),
+        db.session.execute(db.select(Animal.name, Animal.breed, Animal.status, Animal.created_at)
+                           .order_by(Animal.id)).all(),
+        db.session.execute(db.select(Photo.filename).order_by(Photo.id)).all(),
+        db.session.execute(db.select(Adoption.animal_id, Adoption.user_id, Adoption.status,
+                                     Adoption.application_date).order_by(Adoption.id)).all(),
+    )
+
+
+def wipe():
+    for model in (Adoption, Photo, Animal, User):
+        db.session.execute(db.delete(model))
+    db.session.commit()
+
+
+def test_seed_is_deterministic(app):
+    totals = seed_database(30, 40, 1.5, 200, seed=7, batch_size=16, log=lambda message: None)
+    assert totals['users'] == 30 and totals['animals'] == 40 and totals['adoptions'] > 0
+    first = snapshot()
+
+    wipe()
+    seed_database(30, 40, 1.5, 200, seed=7, batch_size=16, log=lambda message: None)
+    assert snapshot() == first
+
+    wipe()
+    seed_database(30, 40, 1.5, 200, seed=8, batch_size=16, log=lambda message: None)
+    assert snapshot() != first
+
+
+def test_seed_command_keeps_invariants(app, client):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['seed', '--users', '20', '--animals', '30', '--adoptions', '150',
+                                 '--batch-size', '7'])
+    assert result.exit_code == 0, result.output
+
+    pairs = db.session.execute(db.select(Adoption.animal_id, Adoption.user_id)).all()
+    assert len(pairs) == len(set(pairs))
+    late = db.session.scalar(db.select(db.func.count()).select_from(Adoption).join(Animal)
+                             .where(Adoption.application_date < Animal.created_at))
+    assert late == 0
+    accepted = db.session.execute(db.select(Adoption.animal_id).where(Adoption.status == 'accepted')).scalars().all()
+    assert len(accepted) == len(set(accepted))
+    assert runner.invoke(args=['check-adoption-counters']).exit_code == 0
+
+    user = db.session.scalars(db.select(User).order_by(User.id)).first()
+    login = user.login
+    db.session.expunge_all()
+    response = client.post('/login', data={'login': login, 'password': SEED_PASSWORD})
+    assert response.status_code == 302
+
+
+def test_seed_requires_roles(app):
+    db.session.execute(db.delete(User))
+    db.session.execute(db.text('DELETE FROM roles'))
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['seed', '--users', '1', '--animals', '1'])
+    assert result.exit_code != 0
+    assert 'init-db' in result.output
@@ -0,0 +1,69 @@
+import logging
+import json
+import pytest
+from app import db
+from app.models import Animal
+from app.sqltrace import statement_shape, record_queries
+from app.tests.conftest import make_animal, make_user, login, query_budget
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape('SELECT * FROM animals WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT *\n  FROM animals WHERE id IN (?, ?)')
+
+
+def test_failed_statement_leaves_no_trace_state(app):
+    with record_queries(keep_statements=True) as recording:
+        with db.engine.connect() as connection:
+            with pytest.raises(Exception):
+                connection.exec_driver_sql('SELECT * FROM no_such_table')
+            connection.exec_driver_sql('SELECT 1')
+            assert not any(key.startswith('sqltrace') for key in connection.info)
+    assert recording.statements == ['SELECT 1']
+    assert 0 <= recording.duration < 1
+
+
+def test_server_timing_header(client):
+    make_animal('Барсик')
+    response = client.get('/animal/1')
+    header = response.headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert 'queries"' in header
+
+
+def test_structured_log_line_reports_repeats(app, client, caplog):
+    app.config['SQL_REPEAT_THRESHOLD'] = 2
+    make_animal('Барсик')
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        client.get('/')
+    records = [json.loads(record.getMessage()) for record in caplog.records if '"event": "sql"' in record.getMessage()]
+    assert records[-1]['endpoint'] == 'routes.index'
+    assert records[-1]['queries'] >= 1 and records[-1]['db_ms'] >= 0
+
+
+def test_query_budget_fails_on_repeated_statement(app):
+    make_animal('Барсик')
+    with pytest.raises(AssertionError, match='3 раз'):
+        with query_budget(max_repeats=2):
+            for _ in range(3):
+                db.session.execute(db.select(Animal.name).where(Animal.id == 1)).all()
+    with pytest.raises(AssertionError, match='бюджете 1'):
+        with query_budget(max_queries=1):
+            db.session.execute(db.select(Animal.name)).all()
+            db.session.execute(db.select(Animal.id)).all()
+
+
+def test_moderator_animal_page_has_no_n_plus_one(client):
+    animal = make_animal('Барсик', status='adoption', adoptions=5)
+    make_user('moder', role_name='moderator')
+    login(client, 'moder')
+    with query_budget(max_queries=6, max_repeats=1):
+        response = client.get(f'/animal/{animal.id}')
+    assert response.status_code == 200
+
+
+def test_catalogue_page_budget(client):
+    for i in range(9):
+        make_animal(f'Питомец {i}', photos=2, adoptions=1)
+    with query_budget(max_queries=2, max_repeats=1):
+        client.get('/')
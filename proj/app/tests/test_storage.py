@@ -0,0 +1,169 @@
+import os
+import re
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import Animal, Photo, PhotoBlob
+from app.storage import StoredUpload, acquire_blob, discard_uploads
+from app.tests.conftest import make_user, login, post_animal, run_jobs, count_queries
+
+
+def files_on_disk(app):
+    root = app.config['UPLOAD_FOLDER']
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root)
+        for dirpath, _, names in os.walk(root) if not dirpath.startswith(os.path.join(root, 'tmp'))
+        for name in names
+    )
+
+
+@pytest.fixture
+def foreign_keys(app):
+    """Включает проверку внешних ключей SQLite, как в PostgreSQL."""
+    def enable(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+    event.listen(db.engine, 'connect', enable)
+    db.session.remove()
+    db.engine.dispose()
+    yield
+    event.remove(db.engine, 'connect', enable)
+    db.session.remove()
+    db.engine.dispose()
+
+
+def admin(client):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+
+
+def test_same_name_different_content_keeps_both_files(app, client):
+    admin(client)
+    post_animal(client, [(b'first image', 'photo.jpg'), (b'second image', 'photo.jpg')])
+    photos = db.session.scalars(db.select(Photo)).all()
+    assert len({photo.filename for photo in photos}) == 2
+    assert len(files_on_disk(app)) == 2
+
+
+def test_files_are_sharded_by_content_hash(app, client):
+    admin(client)
+    post_animal(client, [(b'image bytes', 'Фото кота.JPG')])
+    photo = db.session.scalar(db.select(Photo))
+    assert re.fullmatch(r'([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.jpg', photo.filename)
+    assert photo.content_hash == photo.filename.split('/')[-1][:-4]
+
+
+def test_duplicate_uploads_share_one_blob_until_last_delete(app, client):
+    admin(client)
+    post_animal(client, [(b'same image', 'a.jpg')], name='Первый')
+    post_animal(client, [(b'same image', 'b.jpg')], name='Второй')
+
+    blob = db.session.scalar(db.select(PhotoBlob))
+    assert blob.ref_count == 2
+    assert files_on_disk(app) == [blob.filename]
+
+    first, second = db.session.scalars(db.select(Animal).order_by(Animal.id)).all()
+    client.post(f'/animal/{first.id}/delete')
+    db.session.expire_all()
+    assert db.session.get(PhotoBlob, blob.content_hash).ref_count == 1
+    assert files_on_disk(app) == [blob.filename]
+
+    client.post(f'/animal/{second.id}/delete')
+    db.session.expire_all()
+    assert db.session.get(PhotoBlob, blob.content_hash) is None
+    run_jobs(app)
+    assert files_on_disk(app) == []
+
+
+def test_oversized_file_is_rejected_without_leftovers(app, client):
+    app.config['UPLOAD_MAX_FILE_BYTES'] = 1024
+    admin(client)
+    response = post_animal(client, [(b'small', 'a.jpg'), (b'x' * 4096, 'big.jpg')])
+    assert 'больше допустимых' in response.get_data(as_text=True)
+    assert db.session.scalar(db.select(Animal)) is None
+    assert files_on_disk(app) == []
+    assert os.listdir(os.path.join(app.config['UPLOAD_FOLDER'], 'tmp')) == []
+
+
+def test_request_size_limit_returns_to_form(app, client):
+    app.config['MAX_CONTENT_LENGTH'] = 2048
+    admin(client)
+    response = post_animal(client, [(b'x' * 4096, 'big.jpg')])
+    assert response.status_code == 302
+    assert db.session.scalar(db.select(Animal)) is None
+
+
+def test_many_files_are_saved(app, client):
+    admin(client)
+    post_animal(client, [(f'image {i}'.encode() * 10000, f'{i}.jpg') for i in range(6)])
+    assert len(db.session.scalars(db.select(Photo)).all()) == 6
+    assert len(files_on_disk(app)) == 6
+
+
+def test_failed_insert_removes_written_files(app, client, monkeypatch):
+    admin(client)
+
+    def broken_acquire(stored):
+        raise RuntimeError('БД недоступна')
+    monkeypatch.setattr('app.routes.acquire_blob', broken_acquire)
+
+    response = post_animal(client, [(b'image', 'a.jpg')])
+    assert 'БД недоступна' in response.get_data(as_text=True)
+    assert db.session.scalar(db.select(Animal)) is None
+    assert files_on_disk(app) == []
+
+
+def test_blob_rows_are_ordered_with_foreign_keys(app, client, foreign_keys):
+    admin(client)
+    response = post_animal(client, [(b'fk image', 'a.jpg')], name='Первый')
+    assert response.status_code == 302
+    post_animal(client, [(b'fk image', 'b.jpg')], name='Второй')
+    assert len(db.session.scalars(db.select(Photo)).all()) == 2
+
+    for animal_id in db.session.scalars(db.select(Animal.id).order_by(Animal.id)).all():
+        response = client.post(f'/animal/{animal_id}/delete', follow_redirects=True)
+        assert 'удалены' in response.get_data(as_text=True)
+    db.session.expire_all()
+    assert db.session.scalar(db.select(PhotoBlob)) is None
+    assert db.session.scalar(db.select(Photo)) is None
+
+
+def test_same_content_with_other_extension_reuses_blob_file(app, client):
+    admin(client)
+    post_animal(client, [(b'same bytes', 'a.jpg')], name='Первый')
+    post_animal(client, [(b'same bytes', 'a.png')], name='Второй')
+
+    blob = db.session.scalar(db.select(PhotoBlob))
+    assert blob.ref_count == 2
+    assert {photo.filename for photo in db.session.scalars(db.select(Photo))} == {blob.filename}
+    assert files_on_disk(app) == [blob.filename]
+
+    for animal_id in db.session.scalars(db.select(Animal.id)).all():
+        client.post(f'/animal/{animal_id}/delete')
+    run_jobs(app)
+    assert files_on_disk(app) == []
+
+
+def test_acquire_blob_is_a_single_upsert(app):
+    stored = StoredUpload('ab/cd/abcd.jpg', 'abcd', 10, 'image/jpeg', True)
+    with count_queries() as statements:
+        acquire_blob(stored)
+    assert 'ON CONFLICT' in statements[0]
+    acquire_blob(stored._replace(filename='ab/cd/abcd.png'))
+    db.session.commit()
+    blob = db.session.get(PhotoBlob, 'abcd')
+    assert blob.ref_count == 2 and blob.filename == 'ab/cd/abcd.jpg'
+
+
+def test_failed_upload_keeps_file_of_concurrent_winner(app):
+    # Те же байты одновременно загрузила другая транзакция и успела её зафиксировать
+    root = app.config['UPLOAD_FOLDER']
+    stored = StoredUpload('ab/cd/abcd.jpg', 'abcd', 10, 'image/jpeg', True)
+    other = StoredUpload('ef/gh/efgh.jpg', 'efgh', 10, 'image/jpeg', True)
+    for upload in (stored, other):
+        os.makedirs(os.path.dirname(os.path.join(root, upload.filename)), exist_ok=True)
+        open(os.path.join(root, upload.filename), 'wb').close()
+    db.session.add(PhotoBlob(content_hash='abcd', filename=stored.filename, size=10, ref_count=1))
+    db.session.commit()
+
+    discard_uploads(root, [stored, other])
+    assert files_on_disk(app) == [stored.filename]
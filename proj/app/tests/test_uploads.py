@@ -0,0 +1,59 @@
+import os
+from app import db
+from app.models import Photo
+from app.tests.conftest import make_user, login, post_animal
+
+
+def upload(client):
+    make_user('boss', role_name='admin')
+    login(client, 'boss')
+    post_animal(client, [(b'image bytes', 'cat.jpg')])
+    return db.session.scalar(db.select(Photo))
+
+
+def test_content_hashed_upload_is_immutable(client):
+    photo = upload(client)
+    response = client.get(f'/uploads/{photo.filename}')
+    assert response.status_code == 200
+    assert response.data == b'image bytes'
+    assert response.headers['ETag'] == f'"{photo.content_hash}.jpg"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+
+def test_conditional_request_returns_304_without_reading_file(app, client):
+    photo = upload(client)
+    os.remove(os.path.join(app.config['UPLOAD_FOLDER'], photo.filename))
+    response = client.get(f'/uploads/{photo.filename}',
+                          headers={'If-None-Match': f'"{photo.content_hash}.jpg"'})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_legacy_name_gets_short_cache_lifetime(app, client):
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], 'photo.jpg'), 'wb') as f:
+        f.write(b'old photo')
+    response = client.get('/uploads/photo.jpg')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers['Cache-Control']
+    assert f"max-age={app.config['UPLOAD_CACHE_MAX_AGE']}" in response.headers['Cache-Control']
+
+    again = client.get('/uploads/photo.jpg', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_accel_redirect_hands_transfer_to_nginx(app, client):
+    photo = upload(client)
+    app.config['UPLOAD_ACCEL_REDIRECT'] = '/protected-uploads/'
+    response = client.get(f'/uploads/{photo.filename}')
+    assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/{photo.filename}'
+    assert response.data == b''
+    assert response.mimetype == 'image/jpeg'
+
+
+def test_traversal_and_temp_files_are_not_served(app, client):
+    assert client.get('/uploads/../config.py').status_code == 404
+    assert client.get('/uploads/tmp/anything').status_code == 404
+    app.config['UPLOAD_ACCEL_REDIRECT'] = '/protected-uploads/'
+    assert client.get('/uploads/missing.jpg').status_code == 404
@@ -0,0 +1,44 @@
+# benchmarks/bench_database.py
+"""
+База данных бенчмарков. Адрес берётся из отдельной переменной BENCH_DATABASE_URL,
+а не из DATABASE_URL приложения, чтобы бенчмарк случайно не попал в рабочую базу;
+без неё используется временный файл SQLite. Таблицы внешней базы удаляются только
+с явным --reset-db. Схема строится так же, как при развёртывании: flask init-db
+(create_all), затем миграции (flask db upgrade) - с их индексами и tsvector.
+"""
+
+import os
+import tempfile
+from flask_migrate import upgrade
+from sqlalchemy import text
+from app import db
+
+BENCH_DATABASE_ENV = 'BENCH_DATABASE_URL'
+MIGRATIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'migrations'))
+
+
+def external_database_uri():
+    return os.environ.get(BENCH_DATABASE_ENV)
+
+
+def bench_database_uri():
+    return external_database_uri() or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+
+def may_reset(reset_db):
+    """Временную базу можно очищать всегда, внешнюю - только с --reset-db."""
+    return reset_db or external_database_uri() is None
+
+
+def drop_schema():
+    db.drop_all()
+    db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+
+def prepare_schema(reset):
+    """Создаёт схему как при развёртывании; reset=True - сначала удаляет все таблицы приложения."""
+    if reset:
+        drop_schema()
+    db.create_all()
+    upgrade(directory=MIGRATIONS_DIR)
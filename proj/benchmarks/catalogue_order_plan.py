@@ -0,0 +1,108 @@
+# benchmarks/catalogue_order_plan.py
+"""
+Сравнение плана и времени первой страницы каталога: сортировка по выражению
+case() против сортировки по колонке status_rank с индексом
+ix_animals_catalogue_order.
+
+Запуск из каталога proj:
+    python benchmarks/catalogue_order_plan.py --animals 200000
+    BENCH_DATABASE_URL=postgresql://.../bench python benchmarks/catalogue_order_plan.py --reset-db
+
+Без BENCH_DATABASE_URL используется временная база SQLite (см. bench_database.py).
+Внешняя база очищается до и после замера, поэтому для неё нужен явный --reset-db.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import case, insert, text  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Animal, STATUS_RANK, UNKNOWN_STATUS_RANK  # noqa: E402
+from bench_database import bench_database_uri, may_reset, prepare_schema, drop_schema  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def seed(count):
+    statuses = list(STATUS_RANK)
+    start = datetime(2020, 1, 1)
+    rows = [
+        dict(name=f'Питомец {i}', description='Описание', age_in_months=random.randint(1, 180),
+             breed='Дворняга', gender=random.choice(['male', 'female']),
+             status=random.choice(statuses), created_at=start + timedelta(minutes=i))
+        for i in range(count)
+    ]
+    for offset in range(0, count, 10000):
+        db.session.execute(insert(Animal), rows[offset:offset + 10000])
+    db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('ANALYZE animals'))
+    else:
+        db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def page_statement(ordering):
+    return db.select(Animal.id, Animal.name).order_by(*ordering).limit(9)
+
+
+def explain(stmt):
+    sql = str(stmt.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'postgresql':
+        rows = db.session.execute(text('EXPLAIN (ANALYZE, BUFFERS) ' + sql))
+        return '\n'.join(row[0] for row in rows)
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))
+    return '\n'.join(row[-1] for row in rows)
+
+
+def timed(stmt, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        db.session.execute(stmt).all()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--animals', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--reset-db', action='store_true', help='удалить все таблицы BENCH_DATABASE_URL до и после замера')
+    args = parser.parse_args()
+    if not may_reset(args.reset_db):
+        parser.error('замер очищает базу: для BENCH_DATABASE_URL укажите --reset-db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = bench_database_uri()
+        UPLOAD_FOLDER = tempfile.mkdtemp()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        prepare_schema(reset=True)
+        print(f'Заполнение {args.animals} животных ({db.engine.dialect.name})...')
+        seed(args.animals)
+
+        status_case = case(
+            *[(Animal.status == status, rank) for status, rank in STATUS_RANK.items()],
+            else_=UNKNOWN_STATUS_RANK
+        )
+        variants = [
+            ('case() в ORDER BY', [status_case, Animal.created_at.desc(), Animal.id]),
+            ('колонка status_rank', [Animal.status_rank, Animal.created_at.desc(), Animal.id]),
+        ]
+        for title, ordering in variants:
+            stmt = page_statement(ordering)
+            print(f'\n=== {title} ===')
+            print(explain(stmt))
+            print(f'Среднее время первой страницы: {timed(stmt, args.repeat):.2f} мс')
+
+        drop_schema()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/login_throughput.py
+"""
+Пропускная способность проверки пароля при входе для разных параметров KDF
+и размеров пула PASSWORD_HASH_WORKERS. Клиенты - потоки, как потоки
+gunicorn/gthread в одном процессе; база данных не участвует.
+
+Запуск из каталога proj:
+    python benchmarks/login_throughput.py
+    python benchmarks/login_throughput.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --workers 1 2 4 --clients 16
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.passwords import PasswordHasher  # noqa: E402
+
+
+def run(method, workers, clients, logins):
+    hasher = PasswordHasher()
+    hasher.configure(method, 16, workers)
+    password_hash = hasher.hash('password123')
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(logins):
+            started = time.perf_counter()
+            hasher.verify(password_hash, 'password123')
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - started
+    hasher.configure(method, 16, 0)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return len(latencies) / total, statistics.median(latencies) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[0, 1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=5, help='входов на клиента')
+    args = parser.parse_args()
+
+    print(f"{'method':<24} {'workers':>7} {'logins/s':>9} {'p50, ms':>9} {'p95, ms':>9}")
+    for method in args.methods:
+        for workers in args.workers:
+            throughput, p50, p95 = run(method, workers, args.clients, args.logins)
+            label = workers if workers else 'inline'
+            print(f'{method:<24} {label:>7} {throughput:>9.1f} {p50:>9.1f} {p95:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+# benchmarks/routes_load.py
+"""
+Нагрузочный тест маршрутов: index, view_animal, login, apply_for_adoption и
+handle_adoption на базе, заполненной app.seed. Клиенты - потоки со своим
+test_client (свои cookie и сессия), как потоки gunicorn/gthread в одном
+процессе. Для каждого сценария считаются пропускная способность и
+перцентили задержки p50/p95/p99; результат пишется в JSON.
+
+Запуск из каталога proj:
+    python benchmarks/routes_load.py --output bench.json
+    python benchmarks/routes_load.py --clients 16 --requests 200 --baseline bench.json
+    BENCH_DATABASE_URL=postgresql://.../bench python benchmarks/routes_load.py --reset-db --animals 100000 --adoptions 1000000
+    BENCH_DATABASE_URL=postgresql://.../bench python benchmarks/routes_load.py --no-seed
+    python benchmarks/routes_load.py --compare new.json --baseline bench.json
+
+Без BENCH_DATABASE_URL используется временная база SQLite (см. bench_database.py).
+Таблицы внешней базы удаляются только с --reset-db, без него данные flask seed
+добавляются к уже имеющимся. С --no-seed база не меняется: берутся уже
+сгенерированные командой flask seed данные. CSRF и ограничение частоты входа отключены,
+чтобы мерить сами маршруты. С --baseline скрипт завершается с кодом 1, если
+пропускная способность упала или p95/p99 выросли больше чем на --threshold
+процентов.
+"""
+
+import argparse
+import html
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db  # noqa: E402
+from app.models import Role, User, Animal, Adoption  # noqa: E402
+from app.seed import BREEDS, SEED_PASSWORD, seed_database  # noqa: E402
+from bench_database import bench_database_uri, external_database_uri, may_reset, prepare_schema, drop_schema  # noqa: E402
+from config import Config  # noqa: E402
+
+SCENARIOS = ('index', 'view_animal', 'login', 'apply_for_adoption', 'handle_adoption')
+# Метрики, рост которых - регрессия, и метрики, падение которых - регрессия
+HIGHER_IS_WORSE = ('p95_ms', 'p99_ms')
+LOWER_IS_WORSE = ('throughput',)
+# Сценарий index: ссылка на следующую страницу каталога и глубина листания
+NEXT_PAGE_LINK = re.compile(r'href="(/\?after=[^"]+)"')
+INDEX_MAX_DEPTH = 20
+
+
+def percentile(values, p):
+    """Перцентиль по ближайшему рангу; values уже отсортированы."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def prepare_database(args):
+    prepare_schema(reset=not args.no_seed and may_reset(args.reset_db))
+    for name, description in (('admin', 'Администратор'), ('moderator', 'Модератор'), ('user', 'Пользователь')):
+        if db.session.scalar(db.select(Role.id).where(Role.name == name)) is None:
+            db.session.add(Role(name=name, description=description))
+    db.session.commit()
+    if not args.no_seed:
+        print(f'Заполнение ({db.engine.dialect.name}): {args.users} пользователей, {args.animals} животных, '
+              f'{args.adoptions} заявок...')
+        seed_database(args.users, args.animals, 2.0, args.adoptions, seed=args.seed, log=lambda message: None)
+
+    moderator_role = db.session.scalar(db.select(Role.id).where(Role.name == 'moderator'))
+    moderator = db.session.scalar(db.select(User).where(User.login == 'bench_moderator'))
+    if moderator is None:
+        moderator = User(login='bench_moderator', last_name='Нагрузкин', first_name='Модератор',
+                         role_id=moderator_role)
+        moderator.set_password(SEED_PASSWORD)
+        db.session.add(moderator)
+        db.session.commit()
+
+    user_role = db.session.scalar(db.select(Role.id).where(Role.name == 'user'))
+    fixtures = {
+        'users': db.session.scalars(db.select(User.login).where(User.role_id == user_role, User.login.like('seed_user_%'))
+                                    .order_by(User.id).limit(args.clients * 8)).all(),
+        'animals': db.session.scalars(db.select(Animal.id)).all(),
+        'open_animals': db.session.scalars(db.select(Animal.id).where(Animal.status != 'adopted')).all(),
+        'pending': db.session.scalars(db.select(Adoption.id).where(Adoption.status == 'pending')
+                                      .order_by(Adoption.id)).all(),
+    }
+    if not fixtures['users'] or not fixtures['animals']:
+        raise SystemExit('В базе нет данных flask seed: запустите без --no-seed или выполните flask seed')
+    db.session.remove()
+    return fixtures
+
+
+def sign_in(client, login):
+    response = client.post('/login', data={'login': login, 'password': SEED_PASSWORD})
+    if response.status_code != 302 or '/login' in response.headers.get('Location', ''):
+        raise RuntimeError(f'Не удалось войти как {login}')
+
+
+class Scenario:
+    """Готовит клиента и выдаёт запросы сценария. Каждый поток вызывает make_client и step со своим rng."""
+
+    def __init__(self, app, name, fixtures):
+        self.app = app
+        self.name = name
+        self.fixtures = fixtures
+        self._lock = threading.Lock()
+        # Каждая заявка модерируется один раз: делим очередь между клиентами
+        self._pending = list(fixtures['pending'])
+        random.Random(0).shuffle(self._pending)
+
+    def make_client(self, index):
+        client = self.app.test_client()
+        if self.name == 'apply_for_adoption':
+            users = self.fixtures['users']
+            sign_in(client, users[index % len(users)])
+        elif self.name == 'handle_adoption':
+            sign_in(client, 'bench_moderator')
+        return client
+
+    def _next_pending(self):
+        with self._lock:
+            return self._pending.pop() if self._pending else None
+
+    def step(self, client, rng):
+        if self.name == 'index':
+            # Каталог листается курсором: клиент идёт по ссылке «Вперёд» прошлого ответа
+            # на глубину до INDEX_MAX_DEPTH страниц, затем начинает сначала (иногда с фильтром)
+            next_url = getattr(client, 'next_page_url', None)
+            if next_url and client.page_depth < INDEX_MAX_DEPTH:
+                response = client.get(next_url)
+                client.page_depth += 1
+            else:
+                params = {'breed': rng.choice(BREEDS)[0]} if rng.random() < 0.3 else {}
+                response = client.get('/', query_string=params)
+                client.page_depth = 1
+            match = NEXT_PAGE_LINK.search(response.get_data(as_text=True))
+            client.next_page_url = html.unescape(match.group(1)) if match else None
+            return response
+        if self.name == 'view_animal':
+            return client.get(f"/animal/{rng.choice(self.fixtures['animals'])}")
+        if self.name == 'login':
+            login_client = self.app.test_client()
+            return login_client.post('/login', data={'login': rng.choice(self.fixtures['users']),
+                                                     'password': SEED_PASSWORD})
+        if self.name == 'apply_for_adoption':
+            animal_id = rng.choice(self.fixtures['open_animals'] or self.fixtures['animals'])
+            return client.post(f'/animal/{animal_id}/apply', data={'contact_info': '+7 900 123-45-67, email@example.com'})
+        if self.name == 'handle_adoption':
+            adoption_id = self._next_pending()
+            if adoption_id is None:
+                return None
+            action = 'accept' if rng.random() < 0.1 else 'reject'
+            return client.post(f'/adoption/{adoption_id}/{action}')
+        raise ValueError(self.name)
+
+
+def run_scenario(app, name, fixtures, args):
+    scenario = Scenario(app, name, fixtures)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    ready = threading.Barrier(args.clients + 1)
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        try:
+            client = scenario.make_client(index)
+            for _ in range(args.warmup):
+                scenario.step(client, rng)
+        except Exception as exc:
+            with lock:
+                errors.append(repr(exc))
+            ready.wait()
+            return
+        ready.wait()
+        local, failed = [], 0
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            try:
+                response = scenario.step(client, rng)
+            except Exception as exc:
+                failed += 1
+                with lock:
+                    errors.append(repr(exc))
+                continue
+            if response is None:
+                break
+            local.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors.extend(['http'] * failed)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(ms[-1], 3) if ms else 0.0,
+        'error_samples': sorted(set(errors) - {'http'})[:3],
+    }
+
+
+def compare(current, baseline, threshold):
+    """Возвращает строки (сценарий, метрика, было, стало, изменение %, регрессия)."""
+    rows = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for metric in LOWER_IS_WORSE + HIGHER_IS_WORSE:
+            before, after = base.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if metric in LOWER_IS_WORSE else change
+            rows.append((name, metric, before, after, change, worse > threshold))
+    return rows
+
+
+def print_results(results):
+    print(f"\n{'scenario':<20} {'req':>6} {'err':>5} {'req/s':>9} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}")
+    for name, result in results['scenarios'].items():
+        print(f"{name:<20} {result['requests']:>6} {result['errors']:>5} {result['throughput']:>9.1f} "
+              f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+        for sample in result.get('error_samples', ()):
+            print(f'    {sample}')
+
+
+def print_comparison(rows, threshold):
+    print(f"\nСравнение с базовой линией (порог {threshold:g}%):")
+    print(f"{'scenario':<20} {'metric':<11} {'было':>10} {'стало':>10} {'изм., %':>8}")
+    for name, metric, before, after, change, regressed in rows:
+        mark = '  РЕГРЕССИЯ' if regressed else ''
+        print(f'{name:<20} {metric:<11} {before:>10.2f} {after:>10.2f} {change:>+8.1f}{mark}')
+
+
+def run(args):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = bench_database_uri()
+        UPLOAD_FOLDER = tempfile.mkdtemp()
+        WTF_CSRF_ENABLED = False
+        RATE_LIMIT_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        fixtures = prepare_database(args)
+        dialect = db.engine.dialect.name
+
+    results = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': dialect,
+            'python': platform.python_version(),
+            'clients': args.clients,
+            'requests_per_client': args.requests,
+            'seed': args.seed,
+            'users': args.users, 'animals': args.animals, 'adoptions': args.adoptions,
+            'seeded': not args.no_seed,
+        },
+        'scenarios': {},
+    }
+    for name in args.scenarios:
+        print(f'Сценарий {name}...')
+        results['scenarios'][name] = run_scenario(app, name, fixtures, args)
+
+    if external_database_uri() is None:
+        with app.app_context():
+            drop_schema()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='запросов на клиента в каждом сценарии')
+    parser.add_argument('--warmup', type=int, default=5, help='запросов на клиента до начала замера')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--animals', type=int, default=5000)
+    parser.add_argument('--adoptions', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-seed', action='store_true', help='использовать данные, уже лежащие в BENCH_DATABASE_URL')
+    parser.add_argument('--reset-db', action='store_true',
+                        help='удалить все таблицы BENCH_DATABASE_URL перед заполнением')
+    parser.add_argument('--output', help='куда записать результат в JSON')
+    parser.add_argument('--baseline', help='JSON прошлого запуска для сравнения')
+    parser.add_argument('--compare', help='не запускать нагрузку, а сравнить этот JSON с --baseline')
+    parser.add_argument('--threshold', type=float, default=10.0, help='допустимое ухудшение, %%')
+    args = parser.parse_args()
+    if args.reset_db and args.no_seed:
+        parser.error('--reset-db и --no-seed несовместимы')
+
+    if args.compare:
+        if not args.baseline:
+            parser.error('--compare требует --baseline')
+        with open(args.compare, encoding='utf-8') as f:
+            results = json.load(f)
+    else:
+        results = run(args)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'\nРезультат записан в {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
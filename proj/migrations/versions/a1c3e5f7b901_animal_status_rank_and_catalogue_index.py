@@ -0,0 +1,45 @@
+"""animal status rank and catalogue index
+
+Добавляет генерируемую колонку animals.status_rank и составной индекс
+(status_rank, created_at DESC, id), по которому читается каталог.
+Таблицы создаются командой `flask init-db`, поэтому миграция пропускает
+колонку и индекс, если они уже есть.
+
+Revision ID: a1c3e5f7b901
+Revises: 
+Create Date: 2026-10-18 09:07:42.202772
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b901'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+STATUS_RANK_SQL = "CASE status WHEN 'available' THEN 1 WHEN 'adoption' THEN 2 WHEN 'adopted' THEN 3 ELSE 4 END"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('animals')}
+    indexes = {index['name'] for index in inspector.get_indexes('animals')}
+
+    if 'status_rank' not in columns:
+        op.add_column('animals', sa.Column(
+            'status_rank', sa.SmallInteger(), sa.Computed(STATUS_RANK_SQL, persisted=True)
+        ))
+    if 'ix_animals_catalogue_order' not in indexes:
+        op.create_index(
+            'ix_animals_catalogue_order', 'animals',
+            ['status_rank', sa.text('created_at DESC'), 'id']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_animals_catalogue_order', table_name='animals')
+    op.drop_column('animals', 'status_rank')
@@ -0,0 +1,39 @@
+"""animal adoption counters
+
+Денормализованные счётчики заявок animals.adoption_count и animals.pending_count.
+Существующие значения заполняются одним UPDATE с подзапросами; позже их можно
+сверить командой `flask check-adoption-counters`.
+
+Revision ID: a8e0c2f4b637
+Revises: f2b4d6f8a321
+Create Date: 2026-10-18 09:24:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e0c2f4b637'
+down_revision = 'f2b4d6f8a321'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('animals')}
+    for name in ('adoption_count', 'pending_count'):
+        if name not in columns:
+            op.add_column('animals', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        "UPDATE animals SET "
+        "adoption_count = (SELECT COUNT(*) FROM adoptions WHERE adoptions.animal_id = animals.id), "
+        "pending_count = (SELECT COUNT(*) FROM adoptions "
+        "WHERE adoptions.animal_id = animals.id AND adoptions.status = 'pending')"
+    )
+
+
+def downgrade():
+    op.drop_column('animals', 'pending_count')
+    op.drop_column('animals', 'adoption_count')
@@ -0,0 +1,28 @@
+"""adoption queue index
+
+Составной индекс adoptions (status, application_date, id) для очереди модерации.
+
+Revision ID: b2d4f6a8c049
+Revises: a8e0c2f4b637
+Create Date: 2026-10-18 09:31:05.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c049'
+down_revision = 'a8e0c2f4b637'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('adoptions')}
+    if 'ix_adoptions_queue' not in existing:
+        op.create_index('ix_adoptions_queue', 'adoptions', ['status', 'application_date', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_adoptions_queue', table_name='adoptions')
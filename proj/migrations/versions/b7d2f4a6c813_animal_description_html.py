@@ -0,0 +1,29 @@
+"""animal description html
+
+Колонка animals.description_html с заранее отрендеренным описанием.
+После применения заполните её командой `flask backfill-descriptions`.
+
+Revision ID: b7d2f4a6c813
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 09:10:00.942621
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a6c813'
+down_revision = 'a1c3e5f7b901'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('animals')}
+    if 'description_html' not in columns:
+        op.add_column('animals', sa.Column('description_html', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('animals', 'description_html')
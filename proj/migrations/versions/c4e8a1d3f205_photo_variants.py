@@ -0,0 +1,36 @@
+"""photo variants
+
+Размеры оригинала и описание уменьшенных JPEG/WebP-копий в photos.
+
+Revision ID: c4e8a1d3f205
+Revises: b7d2f4a6c813
+Create Date: 2026-10-18 09:11:32.546246
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1d3f205'
+down_revision = 'b7d2f4a6c813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('photos')}
+    with op.batch_alter_table('photos') as batch_op:
+        if 'width' not in columns:
+            batch_op.add_column(sa.Column('width', sa.Integer(), nullable=True))
+        if 'height' not in columns:
+            batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        if 'variants' not in columns:
+            batch_op.add_column(sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_column('variants')
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
@@ -0,0 +1,47 @@
+"""jobs table
+
+Таблица фоновых задач для `flask worker`.
+
+Revision ID: c6a8e0b2d451
+Revises: b2d4f6a8c049
+Create Date: 2026-10-18 09:40:12.318072
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a8e0b2d451'
+down_revision = 'b2d4f6a8c049'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('jobs'):
+        return
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=128), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=64), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index('ix_jobs_ready', 'jobs', ['status', 'run_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_jobs_ready', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,45 @@
+"""content addressed photo blobs
+
+Таблица photo_blobs со счётчиками ссылок и колонка photos.content_hash.
+Старые фотографии остаются без хэша и удаляются как раньше.
+
+Revision ID: d9f1b3c5e707
+Revises: c4e8a1d3f205
+Create Date: 2026-10-18 09:12:39.302490
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f1b3c5e707'
+down_revision = 'c4e8a1d3f205'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('photo_blobs'):
+        op.create_table(
+            'photo_blobs',
+            sa.Column('content_hash', sa.String(length=64), primary_key=True),
+            sa.Column('filename', sa.String(length=255), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+        )
+    if 'content_hash' not in {column['name'] for column in inspector.get_columns('photos')}:
+        with op.batch_alter_table('photos') as batch_op:
+            batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+            batch_op.create_index('ix_photos_content_hash', ['content_hash'])
+            batch_op.create_foreign_key('fk_photos_content_hash', 'photo_blobs',
+                                        ['content_hash'], ['content_hash'])
+
+
+def downgrade():
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_constraint('fk_photos_content_hash', type_='foreignkey')
+        batch_op.drop_index('ix_photos_content_hash')
+        batch_op.drop_column('content_hash')
+    op.drop_table('photo_blobs')
@@ -0,0 +1,54 @@
+"""animal full text search
+
+PostgreSQL: колонка animals.search_vector (tsvector) с GIN-индексом.
+SQLite: виртуальная таблица FTS5 animals_fts. Индекс сразу заполняется
+для существующих животных (повторно - командой `flask rebuild-search-index`).
+
+Revision ID: e3a5c7e9b111
+Revises: d9f1b3c5e707
+Create Date: 2026-10-18 09:16:16.740194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a5c7e9b111'
+down_revision = 'd9f1b3c5e707'
+branch_labels = None
+depends_on = None
+
+
+DOCUMENT_SQL = (
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(breed, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        columns = {column['name'] for column in sa.inspect(bind).get_columns('animals')}
+        if 'search_vector' not in columns:
+            op.execute('ALTER TABLE animals ADD COLUMN search_vector tsvector')
+            op.execute('CREATE INDEX ix_animals_search_vector ON animals USING GIN (search_vector)')
+        op.execute(f'UPDATE animals SET search_vector = {DOCUMENT_SQL}')
+    elif bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS animals_fts USING fts5("
+            "name, breed, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute('DELETE FROM animals_fts')
+        op.execute('INSERT INTO animals_fts (rowid, name, breed, description) '
+                   'SELECT id, name, breed, description FROM animals')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_animals_search_vector')
+        op.execute('ALTER TABLE animals DROP COLUMN IF EXISTS search_vector')
+    elif bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS animals_fts')
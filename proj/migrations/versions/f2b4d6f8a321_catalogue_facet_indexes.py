@@ -0,0 +1,38 @@
+"""catalogue facet indexes
+
+Индексы для фильтров каталога и их счётчиков.
+
+Revision ID: f2b4d6f8a321
+Revises: e3a5c7e9b111
+Create Date: 2026-10-18 09:18:21.820838
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b4d6f8a321'
+down_revision = 'e3a5c7e9b111'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_animals_breed_catalogue', ['breed', 'status_rank', sa.text('created_at DESC'), 'id']),
+    ('ix_animals_gender_catalogue', ['gender', 'status_rank', sa.text('created_at DESC'), 'id']),
+    ('ix_animals_age_in_months', ['age_in_months']),
+    ('ix_animals_facets', ['status', 'gender', 'breed', 'age_in_months']),
+)
+
+
+def upgrade():
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('animals')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'animals', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='animals')